@@ -7,41 +7,129 @@ from PySide6.QtGui import QIcon
 from PySide6.QtCore import QTranslator, QLocale, QObject, QTimer
 
 from timer import TBTimer
-from view import TBPopoverView
 from state import TBStateMachine, TBStateMachineStates
 from log import logger, TBLogEventAppStart
+from history import history
+from statuspage import statusPage
+from settings import settings
+from icons import TBIconCache, TBProgressIconAtlas
+from assets import assets
+from localization import TBJsonTranslator
+from instance import TBInstanceServer, parseCommand, forward
+from profiler import trace
+from metrics import metrics
+from publisher import formatSeconds
 
 
 class TBApp(QApplication):
     def __init__(self, argv):
-        super().__init__(argv)
+        with trace.phase("QApplication"):
+            super().__init__(argv)
         self.setQuitOnLastWindowClosed(False)
+
+        # 两个进程同时启动时只有先监听成功的那个继续，另一个把命令转交后退出
+        self.server = TBInstanceServer(self)
+        self.alreadyRunning = not self.server.listen()
+        if self.alreadyRunning:
+            forward(parseCommand(argv))
+            return
         self.translator = QTranslator()
 
+        with trace.phase("translator"):
+            self.loadTranslator()
+
+        # 可选的运行时指标，需在创建计时器（编译状态机）之前启用
+        metrics.startFromEnvironment()
+
+        # 初始化状态栏项
+        with trace.phase("TBStatusItem"):
+            self.status_item = TBStatusItem()
+
+        # 已经确认是唯一的实例，在状态页上发布初始状态
+        self.status_item.timer.publishStatusPage()
 
+        # 注册命令行和其他进程可以调用的命令
+        self.setupCommands()
+        if metrics.enabled:
+            self.setupMetrics()
 
-        # 加载本地化资源
+        # 记录应用启动
+        with trace.phase("first logger.append"):
+            logger.append(event=TBLogEventAppStart())
+
+        # 退出前写完日志队列
+        self.aboutToQuit.connect(logger.close)
+        self.aboutToQuit.connect(history.close)
+        self.aboutToQuit.connect(statusPage.close)
+        self.aboutToQuit.connect(settings.flush)
+        self.aboutToQuit.connect(self.server.close)
+        self.aboutToQuit.connect(metrics.stop)
+
+        # 第一次进入事件循环即视为启动完成
+        QTimer.singleShot(0, trace.finish)
+
+    def setupCommands(self):
+        timer = self.status_item.timer
+        self.server.status = self.statusReport
+        self.server.addCommand("startStop", lambda request, client: timer.startStop())
+        self.server.addCommand("skipRest", lambda request, client: timer.skipRest())
+        self.server.addCommand("status", lambda request, client: None)
+        self.server.addCommand("show", lambda request, client: self.status_item.showPopover())
+        self.server.addCommand("settings", self.settingsCommand)
+        self.server.addCommand("set", self.setSettingCommand)
+        self.server.attachTimer(timer)
+
+    def settingsCommand(self, request, client):
+        """读取全部设置"""
+        return {"settings": {key: getattr(settings, key) for key in settings.schema}}
+
+    def setSettingCommand(self, request, client):
+        """修改一项设置，键或值非法时抛出异常，由服务器转成错误应答"""
+        key = request.get("key")
+        settings.setValue(key, request.get("value"))
+        return {"settings": {key: getattr(settings, key)}}
+
+    def setupMetrics(self):
+        timer = self.status_item.timer
+        metrics.addCounter("tomatobar_scheduler_wakeups_total", "Scheduler wakeups this session",
+                           lambda: timer.scheduler.wakeups)
+        metrics.addGauge("tomatobar_log_queue_depth", "Events waiting for the log writer thread",
+                         lambda: logger.queueDepth)
+        metrics.addCounter("tomatobar_log_dropped_total", "Log events dropped because the queue was full",
+                           lambda: logger.dropped)
+        metrics.addGauge("tomatobar_subscribers", "Clients subscribed to the control socket",
+                         lambda: len(self.server.subscribers))
+
+    def statusReport(self):
+        """当前状态，附在每个命令应答中"""
+        timer = self.status_item.timer
+        return {
+            "state": timer.stateMachine.currentState.name.lower(),
+            "running": timer.isRunning(),
+            "timeLeft": formatSeconds(timer.remainingSeconds()),
+            "remaining": timer.remainingSeconds(),
+            "consecutiveWorkIntervals": timer.consecutiveWorkIntervals,
+        }
+
+    def loadTranslator(self):
+        """加载本地化资源"""
         locale = QLocale.system().name()
-        localization_dir = "localization"
         lang_file = "en.json"  # 默认英文
         if locale.startswith('zh_'):
             lang_file = "zh-Hans.json"
 
         # 尝试加载 .qm 文件（如果存在），否则加载 .json
-        qm_path = os.path.join(localization_dir, lang_file.replace('.json', '.qm'))
-        json_path = os.path.join(localization_dir, lang_file)
+        qm_path = assets.path(f"localization/{lang_file.replace('.json', '.qm')}")
+        json_path = assets.path(f"localization/{lang_file}")
 
-        if os.path.exists(qm_path):
+        if qm_path:
             if self.translator.load(qm_path):
                 self.installTranslator(self.translator)
-        elif os.path.exists(json_path):
-            pass  # 如果需要运行时加载 JSON，需要自定义翻译逻辑或使用其他库
-
-        # 初始化状态栏项
-        self.status_item = TBStatusItem()
-
-        # 记录应用启动
-        logger.append(event=TBLogEventAppStart())
+        elif json_path:
+            # 运行时加载 JSON，解析结果缓存为二进制查找表
+            self.translator = TBJsonTranslator(self)
+            if self.translator.loadJson(json_path, lang_file[:-len(".json")]):
+                self.installTranslator(self.translator)
 
 class TBStatusItem(QObject):
     shared = None
@@ -52,39 +140,51 @@ class TBStatusItem(QObject):
 
         self.tray_icon = QSystemTrayIcon()
 
-        self.popover = TBPopoverView()
-        self.popover.hide()
+        # 启动时一次性解码全部状态图标
+        with trace.phase("icons"):
+            self.icons = TBIconCache()
+            self.progressIcons = TBProgressIconAtlas(self.icons)
+            self.iconName = None
+            self.devicePixelRatio = QApplication.primaryScreen().devicePixelRatio()
+            self.icons.preload(self.devicePixelRatio)
+        QApplication.instance().primaryScreenChanged.connect(self.onPrimaryScreenChanged)
+
+        with trace.phase("TBTimer"):
+            self.timer = TBTimer()
+
+        # 大多数启动不会打开弹出窗口，第一次点击托盘图标时才创建
+        self.popover = None
 
         self.setIcon("idle")
         self.tray_icon.activated.connect(self.togglePopover)
         self.tray_icon.show()
+        trace.mark("tray icon shown")
 
     def setIcon(self, name):
         """设置图标，name可以是idle, work, shortrest, longrest"""
-        icon_name = name.lower()
-        icon_path = f"Icons/{icon_name}.png"
-
-        if os.path.exists(icon_path):
-            try:
-                self.tray_icon.setIcon(QIcon(icon_path))
-                return
-            except Exception as e:
-                print(f"设置图标失败: {e}")
-        else:
-            alt_paths = [
-                f"icons/{icon_name}.png",
-                f"Icons/{name}.png",
-            ]
-
-            for path in alt_paths:
-                if os.path.exists(path):
-                    try:
-                        self.tray_icon.setIcon(QIcon(path))
-                        return
-                    except Exception as e:
-                        print(f"设置备选图标失败: {e}")
-
-            print(f"警告: 无法找到任何可用图标 for '{name}'")
+        if name == self.iconName:
+            return
+        icon = self.icons.get(name, self.devicePixelRatio)
+        if icon is not None:
+            self.iconName = name
+            self.tray_icon.setIcon(icon)
+
+    def progressFrames(self, name):
+        """取得某状态的进度图标帧（第一次调用时渲染）"""
+        return self.progressIcons.frames(name, self.devicePixelRatio)
+
+    def setProgressIcon(self, icon):
+        """直接换上一帧预渲染的进度图标"""
+        self.iconName = None
+        self.tray_icon.setIcon(icon)
+
+    def onPrimaryScreenChanged(self, screen):
+        """主屏幕变化时按新的设备像素比预加载图标"""
+        self.devicePixelRatio = screen.devicePixelRatio()
+        self.icons.preload(self.devicePixelRatio)
+        name, self.iconName = self.iconName, None
+        if name:
+            self.setIcon(name)
 
     def setTitle(self, title):
         """设置托盘图标的提示文本"""
@@ -93,9 +193,16 @@ class TBStatusItem(QObject):
         else:
             self.tray_icon.setToolTip("TomatoBar")
 
+    def getPopover(self):
+        """取得弹出窗口，第一次调用时创建"""
+        if self.popover is None:
+            from view import TBPopoverView
+            self.popover = TBPopoverView(self.timer)
+        return self.popover
+
     def showPopover(self):
 
-        if self.popover.isVisible():
+        if self.getPopover().isVisible():
             # print("警告: 弹出窗口已经可见，无法再次显示")
             return
         
@@ -110,7 +217,7 @@ class TBStatusItem(QObject):
 
     def closePopover(self):
         """关闭弹出窗口"""
-        if self.popover.isVisible():
+        if self.popover and self.popover.isVisible():
              self.popover.hide()
 
 
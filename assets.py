@@ -0,0 +1,104 @@
+import io
+import json
+import os
+
+# 打包进资源的目录，以及不需要打包的文件
+ASSET_DIRS = ("Assets", "Icons", "localization")
+EXCLUDED_FILES = ("README.md",)
+MANIFEST_NAME = "assets_manifest.json"
+# 资源包内清单的路径
+RESOURCE_MANIFEST = ":/manifest.json"
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def scanAssets(base_dir=BASE_DIR):
+    """扫描资源目录，返回排好序的相对路径列表"""
+    manifest = []
+    for directory in ASSET_DIRS:
+        root = os.path.join(base_dir, directory)
+        for dirpath, _, filenames in os.walk(root):
+            for filename in sorted(filenames):
+                if filename in EXCLUDED_FILES:
+                    continue
+                relative = os.path.relpath(os.path.join(dirpath, filename), base_dir).replace(os.sep, "/")
+                manifest.append(relative)
+    return sorted(manifest)
+
+
+class TBAssets:
+    """资源定位
+
+    第一次使用时加载一次清单：优先使用编译好的 Qt 资源包（resources_rc.py，
+    由 build_resources.py 生成），其次是模块旁边的 assets_manifest.json，
+    都没有时扫描一次资源目录。之后每次查找都只是一次字典访问，与当前工作目录无关。
+    """
+    def __init__(self):
+        self._paths = None
+        self.source = None  # "resources" / "manifest" / "scan"
+
+    def _load(self):
+        manifest, prefix = self._loadCompiled()
+        if manifest is None:
+            manifest, prefix = self._loadManifestFile()
+        if manifest is None:
+            manifest, prefix, self.source = scanAssets(), BASE_DIR + "/", "scan"
+
+        paths = {}
+        for relative in manifest:
+            full = prefix + relative
+            paths[relative] = full
+            # 同时按文件名索引，兼容 Assets/x.dataset/x.wav 这样的旧结构
+            paths.setdefault(os.path.basename(relative), full)
+        self._paths = paths
+
+    def _loadCompiled(self):
+        try:
+            import resources_rc  # noqa: F401  导入即注册资源
+        except ImportError:
+            return None, None
+        from PySide6.QtCore import QFile, QIODevice
+        f = QFile(RESOURCE_MANIFEST)
+        if not f.open(QIODevice.ReadOnly):
+            return None, None
+        try:
+            manifest = json.loads(bytes(f.readAll()).decode("utf-8"))
+        finally:
+            f.close()
+        self.source = "resources"
+        return manifest, ":/"
+
+    def _loadManifestFile(self):
+        try:
+            with open(os.path.join(BASE_DIR, MANIFEST_NAME), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None, None
+        self.source = "manifest"
+        return manifest, BASE_DIR + "/"
+
+    def path(self, name):
+        """资源的完整路径（文件路径或 :/ 资源路径），找不到时返回 None"""
+        if self._paths is None:
+            self._load()
+        return self._paths.get(name)
+
+    def open(self, name):
+        """以二进制只读方式打开资源，资源包中的文件读入内存"""
+        path = self.path(name)
+        if path is None:
+            raise FileNotFoundError(name)
+        if not path.startswith(":/"):
+            return open(path, "rb")
+        from PySide6.QtCore import QFile, QIODevice
+        f = QFile(path)
+        if not f.open(QIODevice.ReadOnly):
+            raise FileNotFoundError(path)
+        try:
+            return io.BytesIO(bytes(f.readAll()))
+        finally:
+            f.close()
+
+
+# 全局资源定位器
+assets = TBAssets()
@@ -0,0 +1,332 @@
+import sys
+import wave
+from array import array
+from collections import OrderedDict
+
+from PySide6.QtCore import QIODevice, QObject, Qt, Signal
+from PySide6.QtMultimedia import QAudio, QAudioFormat, QAudioSink, QMediaDevices
+
+try:
+    import numpy as np
+except ImportError:  # NumPy 可选，没有时退回 array 逐个样本处理
+    np = None
+
+# 混音器的统一格式：44.1 kHz、双声道、16 位
+SAMPLE_RATE = 44100
+CHANNELS = 2
+SAMPLE_WIDTH = 2
+FRAME_BYTES = CHANNELS * SAMPLE_WIDTH
+# 音频输出缓冲约 20 ms，决定触发延迟
+SINK_BUFFER_BYTES = SAMPLE_RATE * FRAME_BYTES // 50
+# 超过满幅的这个比例后开始软削波
+SOFT_CLIP_KNEE = 0.8
+SAMPLE_MIN = -32768
+SAMPLE_MAX = 32767
+# 8 位 WAV 是无符号的，翻转最高位即得到有符号样本的高字节
+_UNSIGNED_TO_SIGNED = bytes(b ^ 0x80 for b in range(256))
+
+
+class TBPcmSound:
+    """解码到内存的 PCM 数据（统一格式）"""
+    __slots__ = ("name", "data")
+
+    def __init__(self, name, data):
+        self.name = name
+        self.data = data
+
+    @property
+    def duration(self):
+        return len(self.data) / (SAMPLE_RATE * FRAME_BYTES)
+
+
+def _samples(data):
+    """小端 16 位 PCM 转为 array('h')"""
+    samples = array("h", data)
+    if sys.byteorder == "big":
+        samples.byteswap()
+    return samples
+
+
+def _sampleBytes(samples):
+    if sys.byteorder == "big":
+        samples = array("h", samples)
+        samples.byteswap()
+    return samples.tobytes()
+
+
+def _toInt16(data, width):
+    """任意位宽的小端 PCM 只保留高 16 位，按字节切片完成，不逐个样本处理"""
+    if width == SAMPLE_WIDTH:
+        return data
+    count = len(data) // width
+    out = bytearray(count * SAMPLE_WIDTH)
+    if width == 1:
+        out[1::2] = data.translate(_UNSIGNED_TO_SIGNED)
+    elif width in (3, 4):
+        out[0::2] = data[width - 2::width]
+        out[1::2] = data[width - 1::width]
+    else:
+        raise ValueError(f"不支持的位宽 {width * 8}")
+    return bytes(out)
+
+
+def _monoToStereo(data):
+    out = bytearray(len(data) * 2)
+    for offset in (0, SAMPLE_WIDTH):
+        out[offset::FRAME_BYTES] = data[0::SAMPLE_WIDTH]
+        out[offset + 1::FRAME_BYTES] = data[1::SAMPLE_WIDTH]
+    return bytes(out)
+
+
+def _resample(data, rate):
+    """线性插值重采样到 SAMPLE_RATE，只在解码时执行一次"""
+    frames = len(data) // FRAME_BYTES
+    count = frames * SAMPLE_RATE // rate
+    if frames == 0 or count == 0:
+        return b""
+    step = rate / SAMPLE_RATE
+    if np is not None:
+        source = np.frombuffer(data, dtype="<i2").reshape(-1, CHANNELS).astype(np.float32)
+        positions = np.arange(count) * step
+        resampled = np.empty((count, CHANNELS), dtype=np.float32)
+        for channel in range(CHANNELS):
+            resampled[:, channel] = np.interp(positions, np.arange(frames), source[:, channel])
+        return np.round(resampled).astype("<i2").tobytes()
+
+    source = _samples(data)
+    out = array("h", bytes(count * FRAME_BYTES))
+    last = frames - 1
+    for index in range(count):
+        position = index * step
+        frame = min(int(position), last)
+        fraction = position - frame
+        following = min(frame + 1, last)
+        for channel in range(CHANNELS):
+            a = source[frame * CHANNELS + channel]
+            b = source[following * CHANNELS + channel]
+            out[index * CHANNELS + channel] = round(a + (b - a) * fraction)
+    return _sampleBytes(out)
+
+
+def decodeWav(source, name=None):
+    """读取 WAV（路径或二进制文件对象）并转换为混音器格式"""
+    with wave.open(source, "rb") as f:
+        channels = f.getnchannels()
+        width = f.getsampwidth()
+        rate = f.getframerate()
+        data = f.readframes(f.getnframes())
+
+    data = _toInt16(data, width)
+    if channels == 1:
+        data = _monoToStereo(data)
+    elif channels != CHANNELS:
+        raise ValueError(f"不支持的声道数 {channels}: {name}")
+    if rate != SAMPLE_RATE:
+        data = _resample(data, rate)
+    return TBPcmSound(name or str(source), bytes(data))
+
+
+def applyGain(data, gain):
+    """对整段 16 位 PCM 施加增益
+
+    音量滑块可以到 200%，超出满幅的部分用 tanh 曲线软削波，
+    避免硬削波的刺耳失真。没有 NumPy 时逐个样本相乘并硬削波。
+    """
+    if gain == 1.0:
+        return data
+    if gain <= 0:
+        return bytes(len(data))
+    if np is None:
+        samples = _samples(data)
+        return _sampleBytes(array("h", (max(SAMPLE_MIN, min(SAMPLE_MAX, int(sample * gain)))
+                                        for sample in samples)))
+
+    samples = np.frombuffer(data, dtype="<i2").astype(np.float32)
+    samples *= gain / 32768.0
+    if gain > 1.0:
+        magnitude = np.abs(samples)
+        over = magnitude > SOFT_CLIP_KNEE
+        headroom = 1.0 - SOFT_CLIP_KNEE
+        samples[over] = np.copysign(
+            SOFT_CLIP_KNEE + headroom * np.tanh((magnitude[over] - SOFT_CLIP_KNEE) / headroom),
+            samples[over])
+    samples *= 32767.0
+    return samples.astype("<i2").tobytes()
+
+
+class TBGainCache:
+    """按 (声音, 音量) 缓存处理后的 PCM，LRU 淘汰
+
+    音量按滑块的 1% 步进取整，拖动滑块时每个取值最多处理一次。
+    """
+    def __init__(self, maxEntries=8):
+        self.maxEntries = maxEntries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, sound, gain):
+        gain = round(gain, 2)
+        if gain == 1.0:
+            return sound
+        key = (sound.name, gain)
+        cached = self._entries.get(key)
+        if cached is not None and cached[0] is sound:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+        processed = TBPcmSound(sound.name, applyGain(sound.data, gain))
+        self._entries[key] = (sound, processed)
+        if len(self._entries) > self.maxEntries:
+            self._entries.popitem(last=False)
+        return processed
+
+    def clear(self):
+        self._entries.clear()
+
+
+# 全局增益缓存，音频输出关闭后依然保留
+gainCache = TBGainCache()
+
+
+def mix(chunks):
+    """把等长的 16 位 PCM 相加并削波；只有一路时原样返回"""
+    if len(chunks) == 1:
+        return chunks[0]
+    if np is not None:
+        total = np.frombuffer(chunks[0], dtype="<i2").astype(np.int32)
+        for chunk in chunks[1:]:
+            total += np.frombuffer(chunk, dtype="<i2")
+        np.clip(total, SAMPLE_MIN, SAMPLE_MAX, out=total)
+        return total.astype("<i2").tobytes()
+    total = _samples(chunks[0])
+    for chunk in chunks[1:]:
+        total = array("h", (max(SAMPLE_MIN, min(SAMPLE_MAX, a + b)) for a, b in zip(total, _samples(chunk))))
+    return _sampleBytes(total)
+
+
+class TBVoice:
+    """一个正在播放的声音，sound 已经施加过增益"""
+    __slots__ = ("sound", "position", "loop", "finished")
+
+    def __init__(self, sound, loop):
+        self.sound = sound
+        self.position = 0
+        self.loop = loop
+        self.finished = False
+
+    def read(self, size):
+        """读取 size 字节，循环声音在结尾处无缝接回开头，非循环声音不足部分补静音"""
+        data = self.sound.data
+        end = self.position + size
+        if end <= len(data):
+            chunk = data[self.position:end]
+            self.position = end
+            if end == len(data):
+                if self.loop:
+                    self.position = 0
+                else:
+                    self.finished = True
+            return chunk
+
+        if not self.loop or not data:
+            chunk = data[self.position:] + bytes(end - len(data))
+            self.finished = True
+            return chunk
+
+        pieces = [data[self.position:]]
+        missing = size - len(pieces[0])
+        while missing >= len(data):
+            pieces.append(data)
+            missing -= len(data)
+        pieces.append(data[:missing])
+        self.position = missing
+        return b"".join(pieces)
+
+
+class TBMixerDevice(QIODevice):
+    """QAudioSink 拉取模式的数据源，把所有活动的声音混合成一路
+
+    没有声音时输出一个缓冲的静音并发出 idle，由引擎暂停输出，
+    不让音频输出在空闲时持续每 20 ms 拉取一次。
+    """
+    idle = Signal()
+
+    def __init__(self):
+        super().__init__()
+        self.voices = []
+
+    def isSequential(self):
+        return True
+
+    def bytesAvailable(self):
+        return SINK_BUFFER_BYTES + super().bytesAvailable()
+
+    def readData(self, maxlen):
+        size = maxlen - maxlen % FRAME_BYTES
+        if size <= 0:
+            return b""
+        chunks = [voice.read(size) for voice in self.voices]
+        self.voices = [voice for voice in self.voices if not voice.finished]
+        if chunks:
+            return mix(chunks)
+        # 上一个声音的结尾此时已经交给输出，补一段静音后请求暂停
+        self.idle.emit()
+        return bytes(size)
+
+    def writeData(self, data):
+        return -1
+
+
+class TBSoundEngine(QObject):
+    """单个 QAudioSink 加软件混音的音效引擎
+
+    所有声音预先解码为 PCM 放在内存里，触发时只是往混音器里加一个 voice，
+    延迟约为一个输出缓冲；多个声音可以重叠，循环声音没有接缝。
+    """
+    def __init__(self):
+        super().__init__()
+        audio_format = QAudioFormat()
+        audio_format.setSampleRate(SAMPLE_RATE)
+        audio_format.setChannelCount(CHANNELS)
+        audio_format.setSampleFormat(QAudioFormat.Int16)
+
+        self.device = TBMixerDevice()
+        self.device.open(QIODevice.ReadOnly)
+        self.sink = QAudioSink(QMediaDevices.defaultAudioOutput(), audio_format, self)
+        self.sink.setBufferSize(SINK_BUFFER_BYTES)
+        # 在 readData 返回之后再暂停
+        self.device.idle.connect(self.onIdle, Qt.QueuedConnection)
+
+    def play(self, sound, gain=1.0, loop=False):
+        """开始播放，返回可用于 stop 的 voice"""
+        voice = TBVoice(gainCache.get(sound, gain), loop)
+        self.device.voices.append(voice)
+        state = self.sink.state()
+        if state == QAudio.State.SuspendedState:
+            self.sink.resume()
+        elif state != QAudio.State.ActiveState:
+            self.sink.start(self.device)
+        return voice
+
+    def onIdle(self):
+        """没有声音在播放时暂停输出，下一次 play 时恢复"""
+        if self.isIdle() and self.sink.state() == QAudio.State.ActiveState:
+            self.sink.suspend()
+
+    def setGain(self, voice, source, gain):
+        """播放中调整音量：换成对应增益的缓冲，保持播放位置"""
+        voice.sound = gainCache.get(source, gain)
+
+    def stop(self, voice):
+        voice.finished = True
+        if voice in self.device.voices:
+            self.device.voices.remove(voice)
+
+    def isIdle(self):
+        return not self.device.voices
+
+    def close(self):
+        self.sink.stop()
+        self.device.close()
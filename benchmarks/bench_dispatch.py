@@ -0,0 +1,62 @@
+"""状态机分发路径微基准
+
+用法: python -m benchmarks.bench_dispatch [轮数]
+用与 TBTimer 相同的路由和处理器布局，对比原来的字典查找实现与 freeze() 后的分发表。
+基线直接调用未冻结时的 _dispatch（即原来的 handleEvent，没有运行至完成的排队）；
+冻结后走完整的 handleEvent，包含排队的开销。
+"""
+import sys
+import timeit
+
+from state import TBStateMachine, TBStateMachineEvents as E, TBStateMachineStates as S
+
+
+def noop(from_state, to_state):
+    pass
+
+
+def build(frozen):
+    machine = TBStateMachine(S.IDLE)
+    machine.addRoute(E.START_STOP, S.IDLE, S.WORK)
+    machine.addRoute(E.START_STOP, S.WORK, S.IDLE)
+    machine.addRoute(E.START_STOP, S.REST, S.IDLE)
+    machine.addRoute(E.TIMER_FIRED, S.WORK, S.REST)
+    machine.addRoute(E.TIMER_FIRED, S.REST, S.IDLE, lambda: False)
+    machine.addRoute(E.TIMER_FIRED, S.REST, S.WORK, lambda: True)
+    machine.addRoute(E.SKIP_REST, S.REST, S.WORK)
+    machine.addHandler(None, S.WORK, noop)
+    machine.addHandler(S.WORK, S.REST, noop)
+    machine.addHandler(S.WORK, None, noop)
+    machine.addHandler(None, S.REST, noop)
+    machine.addHandler(S.REST, S.WORK, noop)
+    machine.addHandler(None, S.IDLE, noop)
+    machine.addTransitionHandler(lambda context: None)
+    if frozen:
+        machine.freeze()
+    return machine
+
+
+# IDLE -> WORK -> REST -> WORK -> REST -> WORK -> IDLE，最后在 IDLE 跳过休息是一次无路由的事件
+SEQUENCE = (E.START_STOP, E.TIMER_FIRED, E.TIMER_FIRED, E.TIMER_FIRED, E.SKIP_REST, E.START_STOP,
+            E.SKIP_REST)
+
+
+def run(handle):
+    for event in SEQUENCE:
+        handle(event)
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    results = {}
+    for name, frozen in (("dict lookup", False), ("frozen table", True)):
+        machine = build(frozen)
+        handle = machine.handleEvent if frozen else machine._dispatch
+        elapsed = min(timeit.repeat(lambda: run(handle), number=rounds, repeat=5))
+        results[name] = elapsed / (rounds * len(SEQUENCE)) * 1e9
+        print(f"{name:<14} {results[name]:8.0f} ns/event")
+    print(f"speedup        {results['dict lookup'] / results['frozen table']:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""第二次启动转发命令的耗时
+
+用法: python -m benchmarks.bench_forward [次数]
+需要先启动一个 TomatoBar 实例。每次在新进程中运行 main.py --status，
+报告进程总耗时的中位数，并确认转发路径没有导入 QtWidgets / QtMultimedia。
+"""
+import statistics
+import subprocess
+import sys
+import time
+
+CHECK = """
+import sys, runpy
+sys.argv = ["main.py", "--status"]
+try:
+    runpy.run_path("main.py", run_name="__main__")
+except SystemExit:
+    pass
+heavy = [name for name in ("PySide6.QtWidgets", "PySide6.QtMultimedia") if name in sys.modules]
+print("imported:", ", ".join(heavy) or "none", file=sys.stderr)
+"""
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    check = subprocess.run([sys.executable, "-c", CHECK], capture_output=True, text=True)
+    if check.returncode != 0 or "not running" in check.stderr:
+        print("没有正在运行的实例，请先启动 TomatoBar")
+        sys.exit(1)
+    print(check.stdout.strip())
+    print(check.stderr.strip().splitlines()[-1])
+
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "main.py", "--status"], capture_output=True, check=True)
+        samples.append(time.perf_counter() - start)
+    print(f"main.py --status median {statistics.median(samples) * 1000:.1f} ms  "
+          f"min {min(samples) * 1000:.1f} ms  ({runs} runs, 含解释器启动)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""二进制历史记录聚合耗时
+
+用法: python -m benchmarks.bench_history [年数]
+生成多年的合成历史（每天约 32 次转换），对比 mmap 读取器聚合与逐行解析 JSON 日志。
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+from history import HEADER, RECORD, TBHistoryReader, loadNumpy
+from state import TBStateMachineEvents as E, TBStateMachineStates as S
+
+# 一个完整番茄周期的转换序列
+CYCLE = [
+    (E.START_STOP, S.IDLE, S.WORK, 1500),
+    (E.TIMER_FIRED, S.WORK, S.REST, 300),
+    (E.TIMER_FIRED, S.REST, S.WORK, 1500),
+    (E.START_STOP, S.WORK, S.IDLE, 0),
+]
+
+
+def writeSynthetic(path, records):
+    start = 1_500_000_000_000
+    with open(path, "wb") as f:
+        f.write(HEADER)
+        chunk = bytearray()
+        for i in range(records):
+            event, from_state, to_state, length = CYCLE[i % len(CYCLE)]
+            chunk += RECORD.pack(start + i * 2_700_000, event.value, from_state.value, to_state.value, length)
+            if len(chunk) >= 1 << 20:
+                f.write(chunk)
+                chunk.clear()
+        f.write(chunk)
+
+
+def jsonBaseline(records):
+    """解析等量 JSON 行的耗时（按 10 万行抽样外推）"""
+    sample = min(records, 100_000)
+    line = json.dumps({"event": "TBStateMachineEvents.TIMER_FIRED", "fromState": "TBStateMachineStates.WORK",
+                       "timestamp": 1500000000.0, "toState": "TBStateMachineStates.REST", "type": "transition"},
+                      sort_keys=True)
+    lines = [line] * sample
+    start = time.perf_counter()
+    for item in lines:
+        json.loads(item)
+    return (time.perf_counter() - start) * records / sample
+
+
+def main():
+    years = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    records = int(years * 365 * 32)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "TomatoBar.history")
+        writeSynthetic(path, records)
+        numpy = loadNumpy()  # 导入 NumPy 不计入聚合耗时
+        start = time.perf_counter()
+        with TBHistoryReader(path) as reader:
+            summary = reader.summarize()
+        elapsed = time.perf_counter() - start
+    print(f"{records} records ({os.path.basename(path)}, numpy={'yes' if numpy is not None else 'no'})")
+    print(f"mmap summarize: {elapsed * 1000:10.1f} ms  {summary}")
+    print(f"json baseline:  {jsonBaseline(records) * 1000:10.1f} ms (parse only)")
+
+
+if __name__ == "__main__":
+    main()
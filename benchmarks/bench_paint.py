@@ -0,0 +1,92 @@
+"""弹出窗口和 ToggleSwitch 的重绘耗时
+
+用法: python -m benchmarks.bench_paint [重绘次数]
+在 offscreen 平台上显示弹出窗口（设置页），反复调用 repaint()，对比：
+  legacy - 旧做法：每次重绘重建圆角路径、调用 setMask、矢量绘制开关
+  cached - 当前做法：遮罩只在尺寸变化时设置，背景和开关使用预渲染的图块
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtCore import Qt, QRectF
+from PySide6.QtGui import QBrush, QColor, QPainter, QPainterPath, QRegion
+from PySide6.QtWidgets import QApplication
+
+from settings import TBSettings
+from simulation import TBMemorySettings, TBNullNotificationCenter, TBNullPlayer
+from timer import TBTimer
+from view import TBPopoverView, ToggleSwitch
+
+
+def legacyPopoverPaint(self, event):
+    painter = QPainter(self)
+    painter.setRenderHint(QPainter.Antialiasing)
+    radius = 10.0
+    pen_width = 3
+    rect = QRectF(self.rect()).adjusted(pen_width / 2, pen_width / 2, -pen_width / 2, -pen_width / 2)
+    path = QPainterPath()
+    path.addRoundedRect(rect, radius, radius)
+    mask_path = QPainterPath()
+    mask_path.addRoundedRect(QRectF(self.rect()), radius, radius)
+    self.setMask(QRegion(mask_path.toFillPolygon().toPolygon()))
+    painter.fillPath(path, Qt.white)
+    pen = painter.pen()
+    pen.setColor(QColor("#BFBEBB"))
+    pen.setWidth(pen_width)
+    painter.setPen(pen)
+    painter.drawPath(path)
+
+
+def legacySwitchPaint(self, event):
+    painter = QPainter(self)
+    painter.setRenderHint(QPainter.Antialiasing)
+    painter.setPen(Qt.NoPen)
+    margins = 3
+    track_height = self.height() - 2 * margins
+    track_radius = track_height / 2.0
+    track_rect = QRectF(margins, margins, self.width() - 2 * margins, track_height)
+    painter.setBrush(QBrush(self._bg_color_on if self._checked else self._bg_color_off))
+    painter.drawRoundedRect(track_rect, track_radius, track_radius)
+    painter.setBrush(QBrush(self._handle_color))
+    painter.drawEllipse(QRectF(self._handle_offset, margins, track_height, track_height))
+
+
+def measure(popover, switches, runs):
+    QApplication.processEvents()
+    start = time.perf_counter()
+    for _ in range(runs):
+        popover.repaint()
+    popover_time = (time.perf_counter() - start) / runs
+    start = time.perf_counter()
+    for _ in range(runs):
+        for switch in switches:
+            switch.repaint()
+    switch_time = (time.perf_counter() - start) / runs / len(switches)
+    return popover_time, switch_time
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    app = QApplication(sys.argv)
+    timer = TBTimer(settings=TBSettings(TBMemorySettings()), player=TBNullPlayer(),
+                    notificationCenter=TBNullNotificationCenter(), recordHistory=False)
+    popover = TBPopoverView(timer)
+    popover.tabWidget.setCurrentIndex(1)
+    popover.show()
+    switches = popover.findChildren(ToggleSwitch)
+
+    cached = measure(popover, switches, runs)
+    TBPopoverView.paintEvent = legacyPopoverPaint
+    ToggleSwitch.paintEvent = legacySwitchPaint
+    legacy = measure(popover, switches, runs)
+
+    for name, (popover_time, switch_time) in (("legacy", legacy), ("cached", cached)):
+        print(f"{name:<7} popover {popover_time * 1e6:8.1f} us/repaint  "
+              f"switch {switch_time * 1e6:8.1f} us/repaint  ({runs} runs, {len(switches)} switches)")
+
+
+if __name__ == "__main__":
+    main()
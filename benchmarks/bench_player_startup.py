@@ -0,0 +1,58 @@
+"""TBPlayer 启动开销对比
+
+用法: python -m benchmarks.bench_player_startup [次数]
+每次在新进程中（offscreen 平台）分别测量：
+  eager - 旧做法：导入 QtMultimedia 并立即创建三组 QMediaPlayer/QAudioOutput
+  lazy  - 当前的 TBPlayer()，播放器在第一次播放时才创建
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+SETUP = """
+import os, sys, time
+from PySide6.QtWidgets import QApplication
+app = QApplication(sys.argv)
+start = time.perf_counter()
+"""
+
+EAGER = SETUP + """
+from PySide6.QtCore import QUrl
+from PySide6.QtMultimedia import QMediaPlayer, QAudioOutput
+players = []
+for name in ("windup.wav", "ding.wav", "ticking.wav"):
+    player = QMediaPlayer()
+    audio = QAudioOutput()
+    player.setAudioOutput(audio)
+    player.setSource(QUrl.fromLocalFile(os.path.abspath(os.path.join("Assets", name))))
+    players.append((player, audio))
+print(time.perf_counter() - start)
+"""
+
+LAZY = SETUP + """
+from player import TBPlayer
+player = TBPlayer()
+print(time.perf_counter() - start)
+"""
+
+
+def measure(code, runs):
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    return samples
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for name, code in (("eager", EAGER), ("lazy", LAZY)):
+        samples = measure(code, runs)
+        print(f"{name:<6} median {statistics.median(samples) * 1000:8.1f} ms  "
+              f"min {min(samples) * 1000:8.1f} ms  ({runs} runs)")
+
+
+if __name__ == "__main__":
+    main()
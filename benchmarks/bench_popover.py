@@ -0,0 +1,74 @@
+"""弹出窗口延迟创建对启动耗时和内存的影响
+
+用法: python -m benchmarks.bench_popover [次数]
+每次在新进程中（offscreen 平台）测量从创建 QApplication 之后到 TBStatusItem
+创建完成的耗时，以及这段时间内常驻内存（RSS）的增长：
+  deferred - 当前做法：启动时不创建弹出窗口
+  eager    - 旧做法：启动时创建弹出窗口并创建全部标签页
+  open     - 第一次点击托盘图标的开销：创建弹出窗口和当前标签页
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+SETUP = """
+import os, sys, time
+
+def rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import psutil
+        return psutil.Process().memory_info().rss
+
+from PySide6.QtWidgets import QApplication
+app = QApplication(sys.argv)
+from app import TBStatusItem
+"""
+
+DEFERRED = SETUP + """
+start, before = time.perf_counter(), rss()
+item = TBStatusItem()
+print(time.perf_counter() - start, rss() - before)
+"""
+
+EAGER = SETUP + """
+start, before = time.perf_counter(), rss()
+item = TBStatusItem()
+popover = item.getPopover()
+for index in range(popover.tabWidget.count()):
+    popover.ensureTab(index)
+print(time.perf_counter() - start, rss() - before)
+"""
+
+OPEN = SETUP + """
+item = TBStatusItem()
+start, before = time.perf_counter(), rss()
+item.getPopover()
+print(time.perf_counter() - start, rss() - before)
+"""
+
+
+def measure(code, runs):
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    times, sizes = [], []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+        elapsed, grown = out.stdout.strip().splitlines()[-1].split()
+        times.append(float(elapsed))
+        sizes.append(int(grown))
+    return times, sizes
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for name, code in (("deferred", DEFERRED), ("eager", EAGER), ("open", OPEN)):
+        times, sizes = measure(code, runs)
+        print(f"{name:<9} median {statistics.median(times) * 1000:8.1f} ms  "
+              f"RSS +{statistics.median(sizes) / 1024:8.0f} KiB  ({runs} runs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""状态转换路径吞吐量
+
+用法: python -m benchmarks.bench_simulation [工作间隔数]
+在虚拟时钟下连续跑完整的工作/休息周期，报告每秒模拟的周期数和转换数。
+"""
+import sys
+import time
+
+from simulation import TBSimulation
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    for stop_after_break in (False, True):
+        sim = TBSimulation(stopAfterBreak=stop_after_break, workIntervalsInSet=4)
+        start = time.perf_counter()
+        sim.runWorkIntervals(count)
+        elapsed = time.perf_counter() - start
+        transitions = sum(sim.transitions.values())
+        print(f"stopAfterBreak={stop_after_break!s:<5} "
+              f"{count / elapsed:>10.0f} cycles/s  "
+              f"{transitions / elapsed:>10.0f} transitions/s  "
+              f"simulated {sim.clock.monotonic() / 3600:.0f} h")
+
+
+if __name__ == "__main__":
+    main()
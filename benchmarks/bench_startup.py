@@ -0,0 +1,76 @@
+"""启动到托盘图标出现的耗时
+
+用法: python -m benchmarks.bench_startup [次数] [--budget 毫秒]
+每次在新进程中（offscreen 平台）运行 main.py，通过 TOMATOBAR_STARTUP_TRACE
+取得各阶段耗时，进入事件循环后立即退出。报告 "tray icon shown" 的中位数，
+给出 --budget 时超出预算以退出码 1 结束，可用于 CI 检查启动回归。
+已有 TomatoBar 实例在运行时 main.py 只会把命令转交给它，测不到启动，因此拒绝运行。
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from profiler import TRACE_ENV, EXIT_ENV
+
+TARGET_MARK = "tray icon shown"
+
+
+def runOnce(trace_path):
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    env[TRACE_ENV] = trace_path
+    env[EXIT_ENV] = "1"
+    subprocess.run([sys.executable, "main.py"], env=env, capture_output=True, check=True, timeout=60)
+    try:
+        with open(trace_path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise RuntimeError(f"没有得到启动记录: {e}")
+    if TARGET_MARK not in data.get("marks", {}):
+        raise RuntimeError(f"启动记录中没有 \"{TARGET_MARK}\"，进程可能没有完成启动")
+    return data
+
+
+def instanceRunning():
+    from instance import sendCommand
+    return sendCommand("status") is not None
+
+
+def main():
+    args = sys.argv[1:]
+    budget = None
+    if "--budget" in args:
+        index = args.index("--budget")
+        budget = float(args[index + 1])
+        del args[index:index + 2]
+    runs = int(args[0]) if args else 5
+
+    if instanceRunning():
+        print("已有 TomatoBar 实例在运行，请先退出它再测量启动耗时")
+        sys.exit(2)
+
+    marks = []
+    phases = {}  # 名称 -> [耗时]
+    with tempfile.TemporaryDirectory() as tmp:
+        for run in range(runs):
+            # 每次使用新的记录文件，不会读到上一次留下的结果
+            data = runOnce(os.path.join(tmp, f"trace-{run}.json"))
+            marks.append(data["marks"][TARGET_MARK])
+            for phase in data["phases"]:
+                phases.setdefault((phase["depth"], phase["name"]), []).append(phase["duration"])
+
+    # 按阶段首次出现的顺序无法跨进程保证，这里按耗时降序列出
+    for (depth, name), samples in sorted(phases.items(), key=lambda item: -statistics.median(item[1])):
+        print(f"  {statistics.median(samples) * 1000:8.1f} ms  {'  ' * depth}{name}")
+    median = statistics.median(marks) * 1000
+    print(f"{TARGET_MARK}: median {median:.1f} ms  min {min(marks) * 1000:.1f} ms  ({runs} runs)")
+
+    if budget is not None and median > budget:
+        print(f"超出启动预算 {budget:.1f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""计时精度和漂移基准
+
+用法: python -m benchmarks.bench_timer_accuracy [--intervals 20] [--length 3]
+                                                 [--history 文件] [--check]
+在 offscreen 平台上用真实的 TBDeadlineTimer 和发布层连续跑多个短间隔，分两种场景：
+  idle - 事件循环空闲
+  load - 每 100 ms 有一次 20 ms 的忙等，模拟界面线程上的其他工作
+报告两项分布（毫秒）：
+  fire delay    - TIMER_FIRED 实际触发时刻晚于截止时刻多少
+  display error - 显示的秒数发生变化时，显示值与真实剩余时间的差（理想为 0）；
+                  每个间隔开始时的第一次发布不计入，它只反映间隔长度的小数部分
+每次的结果追加到历史文件（JSON Lines），并与同一场景最近几次的 p95 比较，
+明显变差时标记为回归；给出 --check 时有回归则以退出码 1 结束。
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtCore import QCoreApplication, QEventLoop, QTimer, Qt
+
+from publisher import TBTimeLeftPublisher
+from scheduler import TBDeadlineTimer, TBSystemClock
+
+DEFAULT_HISTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "timer_accuracy.jsonl")
+# 与最近几次结果的中位数比较
+BASELINE_RUNS = 5
+# p95 超过基线的这个倍数且至少多出 REGRESSION_SLACK 秒时视为回归
+REGRESSION_RATIO = 1.5
+REGRESSION_SLACK = 0.002
+
+SCENARIOS = (
+    ("idle", None),
+    ("load", (100, 20)),  # (周期毫秒, 忙等毫秒)
+)
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples):
+    return {
+        "p50": percentile(samples, 0.50),
+        "p95": percentile(samples, 0.95),
+        "p99": percentile(samples, 0.99),
+        "max": max(samples),
+        "mean": statistics.fmean(samples),
+        "n": len(samples),
+    }
+
+
+def runScenario(intervals, length, load):
+    """连续跑 intervals 个长度为 length 秒的间隔，返回 (触发延迟, 显示误差)"""
+    clock = TBSystemClock()
+    scheduler = TBDeadlineTimer(clock)
+    publisher = TBTimeLeftPublisher()
+    loop = QEventLoop()
+    fire_delays, display_errors = [], []
+    state = {"left": intervals, "deadline": None, "starting": False}
+
+    def onDisplay(text):
+        if state["starting"]:
+            return
+        shown = publisher.totalSeconds
+        remaining = scheduler.remaining()
+        if shown is not None and remaining is not None:
+            display_errors.append(shown - remaining)
+
+    def start():
+        state["deadline"] = clock.monotonic() + length
+        scheduler.start(length)
+        state["starting"] = True
+        publisher.publish(scheduler.remaining())
+        state["starting"] = False
+
+    def onFired():
+        fire_delays.append(clock.monotonic() - state["deadline"])
+        publisher.publish(None)
+        state["left"] -= 1
+        if state["left"]:
+            start()
+        else:
+            loop.quit()
+
+    publisher.addChannel(onDisplay, granularity=1)
+    scheduler.setTickInterval(publisher.activeGranularities())
+    scheduler.tick.connect(lambda: publisher.publish(scheduler.remaining()))
+    scheduler.fired.connect(onFired)
+
+    busy_timer = None
+    if load:
+        period, busy = load
+
+        def spin():
+            end = time.perf_counter() + busy / 1000
+            while time.perf_counter() < end:
+                pass
+        busy_timer = QTimer()
+        busy_timer.setTimerType(Qt.PreciseTimer)
+        busy_timer.timeout.connect(spin)
+        busy_timer.start(period)
+
+    QTimer.singleShot(0, start)
+    loop.exec()
+    if busy_timer:
+        busy_timer.stop()
+    return fire_delays, display_errors
+
+
+def gitRevision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def loadHistory(path):
+    records = []
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return records
+
+
+def findRegressions(record, history):
+    """与同一场景、同一平台、同一间隔长度最近几次的 p95 中位数比较"""
+    regressions = []
+    previous = [r for r in history if r["scenario"] == record["scenario"] and r["platform"] == record["platform"]
+                and r.get("length") == record["length"]]
+    previous = previous[-BASELINE_RUNS:]
+    if not previous:
+        return regressions
+    for metric in ("fireDelay", "displayError"):
+        baseline = statistics.median(r[metric]["p95"] for r in previous)
+        current = record[metric]["p95"]
+        if current > baseline * REGRESSION_RATIO and current - baseline > REGRESSION_SLACK:
+            regressions.append(f"{record['scenario']} {metric} p95 {current * 1000:.2f} ms "
+                               f"(基线 {baseline * 1000:.2f} ms)")
+    return regressions
+
+
+def main():
+    args = sys.argv[1:]
+    options = {"--intervals": "20", "--length": "3", "--history": DEFAULT_HISTORY}
+    check = "--check" in args
+    for name in options:
+        if name in args:
+            options[name] = args[args.index(name) + 1]
+    intervals = int(options["--intervals"])
+    length = float(options["--length"])
+    history_path = options["--history"]
+
+    app = QCoreApplication(sys.argv)
+    history = loadHistory(history_path)
+    revision = gitRevision()
+    regressions = []
+    records = []
+    for name, load in SCENARIOS:
+        fire_delays, display_errors = runScenario(intervals, length, load)
+        record = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "revision": revision,
+            "platform": f"{platform.system()}-{platform.machine()}",
+            "scenario": name,
+            "intervals": intervals,
+            "length": length,
+            "fireDelay": summarize(fire_delays),
+            "displayError": summarize(display_errors),
+        }
+        records.append(record)
+        regressions.extend(findRegressions(record, history))
+        for metric in ("fireDelay", "displayError"):
+            s = record[metric]
+            print(f"{name:<5} {metric:<13} p50 {s['p50'] * 1000:7.2f}  p95 {s['p95'] * 1000:7.2f}  "
+                  f"p99 {s['p99'] * 1000:7.2f}  max {s['max'] * 1000:7.2f} ms  (n={s['n']})")
+
+    try:
+        with open(history_path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+    except OSError as e:
+        print(f"写入历史失败: {e}")
+
+    for regression in regressions:
+        print(f"回归: {regression}")
+    if check and regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
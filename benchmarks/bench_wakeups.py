@@ -0,0 +1,66 @@
+"""计时器每小时唤醒次数对比
+
+用法: python -m benchmarks.bench_wakeups
+按调度算法推演一个小时的唤醒序列，对比旧的 500 ms 轮询与截止时间调度器，
+以及 TBTimer 在不同的活动消费者组合下选出的唤醒粒度。
+"""
+from scheduler import WALL_CHECK_INTERVAL, nextWakeupDelay
+from simulation import TBSimulation
+
+HOUR = 3600.0
+
+
+def legacyWakeups(interval_length):
+    """旧实现：500 ms 轮询，结束时再多一次 100 ms singleShot"""
+    intervals = HOUR / interval_length
+    return int(intervals * (interval_length / 0.5 + 1))
+
+
+def intervalWakeups(interval_length, tick_interval):
+    """截止时间调度器在一个间隔内的唤醒次数"""
+    count = 0
+    remaining = interval_length
+    while remaining > 0:
+        remaining -= min(nextWakeupDelay(remaining, tick_interval), WALL_CHECK_INTERVAL)
+        count += 1
+    return count
+
+
+def deadlineWakeups(interval_length, tick_interval):
+    """截止时间调度器：与旧实现一样按整一小时折算"""
+    return int(HOUR / interval_length * intervalWakeups(interval_length, tick_interval))
+
+
+def consumerTickInterval(popoverVisible, showTimerInMenuBar):
+    """按消费者组合配置一个模拟计时器，返回它选出的唤醒粒度"""
+    sim = TBSimulation(showTimerInMenuBar=showTimerInMenuBar)
+    sim.timer.setTimeLeftChannelActive(sim.timer.popoverChannel, popoverVisible)
+    return sim.scheduler.tickInterval
+
+
+def main():
+    interval_length = 25 * 60
+    rows = [
+        ("legacy 500 ms polling", legacyWakeups(interval_length)),
+        ("deadline, 1 s ticks", deadlineWakeups(interval_length, 1)),
+        ("deadline, 60 s ticks", deadlineWakeups(interval_length, 60)),
+        ("deadline, no ticks", deadlineWakeups(interval_length, None)),
+    ]
+    for name, wakeups in rows:
+        print(f"{name:<24} {wakeups:>6} wakeups/hour")
+
+    print()
+    consumers = [
+        ("popover open", True, True),
+        ("tooltip only", False, True),
+        ("nothing watching", False, False),
+    ]
+    for name, popover, tooltip in consumers:
+        tick = consumerTickInterval(popover, tooltip)
+        wakeups = intervalWakeups(interval_length, tick)
+        ticks = "/".join(str(g) for g in tick) if tick else "none"
+        print(f"{name:<24} tick {ticks:>6}  {wakeups:>6} wakeups/25 min interval")
+
+
+if __name__ == "__main__":
+    main()
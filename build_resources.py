@@ -0,0 +1,49 @@
+"""把 Assets/、Icons/ 和 localization/ 打包成编译好的 Qt 资源
+
+用法: python build_resources.py
+生成 assets_manifest.json、resources.qrc，并调用 pyside6-rcc 生成 resources_rc.py。
+运行时 assets.py 会优先使用 resources_rc.py，没有时退回清单文件或目录扫描。
+"""
+import json
+import os
+import subprocess
+import sys
+from xml.sax.saxutils import escape
+
+from assets import BASE_DIR, MANIFEST_NAME, scanAssets
+
+QRC_NAME = "resources.qrc"
+RC_MODULE = "resources_rc.py"
+
+
+def writeQrc(manifest, manifest_path, qrc_path):
+    lines = ['<!DOCTYPE RCC><RCC version="1.0">', "<qresource>"]
+    lines.append(f'    <file alias="manifest.json">{escape(os.path.basename(manifest_path))}</file>')
+    for relative in manifest:
+        lines.append(f"    <file>{escape(relative)}</file>")
+    lines += ["</qresource>", "</RCC>", ""]
+    with open(qrc_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+
+
+def main():
+    manifest = scanAssets(BASE_DIR)
+    manifest_path = os.path.join(BASE_DIR, MANIFEST_NAME)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    qrc_path = os.path.join(BASE_DIR, QRC_NAME)
+    writeQrc(manifest, manifest_path, qrc_path)
+
+    rc_path = os.path.join(BASE_DIR, RC_MODULE)
+    try:
+        subprocess.run(["pyside6-rcc", qrc_path, "-o", rc_path], check=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"pyside6-rcc 失败，只生成了清单: {e}")
+        return 1
+    print(f"{len(manifest)} 个资源 -> {RC_MODULE}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+import mmap
+import os
+import struct
+
+from state import TBStateMachineEvents, TBStateMachineStates
+
+# 单条记录：毫秒时间戳、事件、源状态、目标状态（均为枚举值）、间隔长度（秒）
+RECORD = struct.Struct("<qBBBxI")
+# 文件头与记录等长，保证记录按 16 字节对齐
+MAGIC = b"TBHIST\x00\x01"
+HEADER = MAGIC.ljust(RECORD.size, b"\x00")
+
+# NumPy 只有读取方汇总时才用到，写入路径在启动时就会导入，不能为它付出导入 NumPy 的代价
+_numpy = None
+RECORD_DTYPE = None
+
+
+def loadNumpy():
+    """第一次汇总时才导入 NumPy，没有安装时返回 None（退回逐条解包）"""
+    global _numpy, RECORD_DTYPE
+    if _numpy is None:
+        try:
+            import numpy
+        except ImportError:
+            _numpy = False
+        else:
+            _numpy = numpy
+            RECORD_DTYPE = numpy.dtype([
+                ("timestamp", "<i8"),
+                ("event", "u1"),
+                ("fromState", "u1"),
+                ("toState", "u1"),
+                ("pad", "V1"),
+                ("intervalLength", "<u4"),
+            ])
+    return _numpy or None
+
+_WORK = TBStateMachineStates.WORK.value
+_REST = TBStateMachineStates.REST.value
+_IDLE = TBStateMachineStates.IDLE.value
+_TIMER_FIRED = TBStateMachineEvents.TIMER_FIRED.value
+_START_STOP = TBStateMachineEvents.START_STOP.value
+
+
+def defaultHistoryPath():
+    """与 TomatoBar.log 放在同一个缓存目录"""
+    from log import logger
+    return os.path.join(os.path.dirname(logger.log_path), "TomatoBar.history")
+
+
+class TBHistoryWriter:
+    """状态转换历史的定长二进制记录写入器
+
+    每条记录一次 O_APPEND 写入，不经过用户态缓冲，也就不需要 flush。
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self._fd = None
+
+    def _open(self):
+        if self.path is None:
+            self.path = defaultHistoryPath()
+        flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0)
+        self._fd = os.open(self.path, flags, 0o644)
+        size = os.fstat(self._fd).st_size
+        if size % RECORD.size:
+            # 上次写入被截断，丢弃末尾的半条记录（也可能是半个文件头）
+            size -= size % RECORD.size
+            os.ftruncate(self._fd, size)
+        if size == 0:
+            os.write(self._fd, HEADER)
+
+    def append(self, context, intervalLength, timestamp):
+        """记录一次状态转换，timestamp 为墙上时间（秒）"""
+        try:
+            if self._fd is None:
+                self._open()
+            os.write(self._fd, RECORD.pack(
+                int(timestamp * 1000),
+                context.event.value,
+                context.fromState.value,
+                context.toState.value,
+                int(intervalLength),
+            ))
+        except Exception as e:
+            print(f"历史记录失败: {e}")
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class TBHistoryReader:
+    """基于 mmap 的只读历史记录访问，切片不复制数据"""
+    def __init__(self, path=None):
+        self.path = path or defaultHistoryPath()
+        self._mmap = None
+        self._view = None
+        self._file = open(self.path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size > len(HEADER):
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if self._mmap[:len(MAGIC)] != MAGIC:
+                self.close()
+                raise ValueError(f"不是 TomatoBar 历史文件: {self.path}")
+            self.count = (size - len(HEADER)) // RECORD.size
+            self._view = memoryview(self._mmap)[len(HEADER):len(HEADER) + self.count * RECORD.size]
+        else:
+            self.count = 0
+            self._view = memoryview(b"")
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # slice() 返回的视图还没释放，映射由最后一个视图释放时回收
+                pass
+            self._mmap = None
+        self._file.close()
+
+    def record(self, index):
+        """第 index 条记录 (timestamp_ms, event, from, to, intervalLength)"""
+        return RECORD.unpack_from(self._view, index * RECORD.size)
+
+    def __iter__(self):
+        return RECORD.iter_unpack(self._view)
+
+    def _timestampAt(self, index):
+        return struct.unpack_from("<q", self._view, index * RECORD.size)[0]
+
+    def bisect(self, timestamp):
+        """第一条时间戳 >= timestamp（秒）的记录下标，记录按时间追加因此有序"""
+        target = int(timestamp * 1000)
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._timestampAt(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def slice(self, start=None, end=None):
+        """返回 [start, end) 时间范围内记录的 memoryview，零拷贝；用完应调用 release()"""
+        first = self.bisect(start) if start is not None else 0
+        last = self.bisect(end) if end is not None else self.count
+        return self._view[first * RECORD.size:last * RECORD.size]
+
+    def summarize(self, start=None, end=None):
+        """汇总时间范围内的转换：完成/中断的工作间隔数以及计划的工作/休息秒数"""
+        np = loadNumpy()
+        view = self.slice(start, end)
+        try:
+            if np is not None:
+                return self._summarizeVectorized(np, view)
+            return self._summarizeScalar(view)
+        finally:
+            view.release()
+
+    @staticmethod
+    def _summarizeVectorized(np, view):
+        records = np.frombuffer(view, dtype=RECORD_DTYPE)
+        event = records["event"]
+        from_state = records["fromState"]
+        to_state = records["toState"]
+        length = records["intervalLength"]
+        return {
+            "transitions": int(len(records)),
+            "completedWork": int(np.count_nonzero(
+                (event == _TIMER_FIRED) & (from_state == _WORK) & (to_state == _REST))),
+            "interruptedWork": int(np.count_nonzero(
+                (event == _START_STOP) & (from_state == _WORK) & (to_state == _IDLE))),
+            "plannedWorkSeconds": int(length[to_state == _WORK].sum(dtype=np.int64)),
+            "plannedRestSeconds": int(length[to_state == _REST].sum(dtype=np.int64)),
+        }
+
+    @staticmethod
+    def _summarizeScalar(view):
+        summary = {
+            "transitions": 0,
+            "completedWork": 0,
+            "interruptedWork": 0,
+            "plannedWorkSeconds": 0,
+            "plannedRestSeconds": 0,
+        }
+        for _, event, from_state, to_state, length in RECORD.iter_unpack(view):
+            summary["transitions"] += 1
+            if to_state == _WORK:
+                summary["plannedWorkSeconds"] += length
+            elif to_state == _REST:
+                summary["plannedRestSeconds"] += length
+                if event == _TIMER_FIRED and from_state == _WORK:
+                    summary["completedWork"] += 1
+            elif event == _START_STOP and from_state == _WORK and to_state == _IDLE:
+                summary["interruptedWork"] += 1
+        return summary
+
+
+# 全局历史记录写入器，第一次写入时才打开文件
+history = TBHistoryWriter()
@@ -0,0 +1,136 @@
+from PySide6.QtCore import Qt, QRectF
+from PySide6.QtGui import QColor, QIcon, QPainter, QPen, QPixmap
+
+from assets import assets
+
+# 托盘中各状态使用的图标
+STATE_ICONS = ("idle", "work", "shortrest", "longrest")
+# 托盘图标常用的逻辑尺寸（像素），小图标、中图标
+TRAY_ICON_SIZES = (16, 24)
+
+# 进度图标：每个状态预渲染的步数（帧数为步数加一）和像素尺寸
+PROGRESS_STEPS = 60
+PROGRESS_ICON_SIZE = 32
+# 各状态的进度环颜色
+PROGRESS_COLORS = {
+    "work": "#E6291E",
+    "shortrest": "#34A853",
+    "longrest": "#1A73E8",
+}
+
+
+class TBIconCache:
+    """托盘图标缓存
+
+    按 (名称, 设备像素比) 缓存解码好的 QIcon，启动时预加载全部状态图标，
+    之后切换图标只是一次字典查找，不再访问文件系统。
+    """
+    def __init__(self):
+        self._icons = {}  # (name, dpr) -> QIcon
+        self.decodes = 0  # 本次会话解码 PNG 的次数
+
+    def preload(self, dpr=1.0, names=STATE_ICONS):
+        """预先解码一组图标"""
+        for name in names:
+            self.get(name, dpr)
+
+    def get(self, name, dpr=1.0):
+        """取得图标，找不到时返回 None"""
+        key = (name.lower(), dpr)
+        icon = self._icons.get(key)
+        if icon is None and key not in self._icons:
+            icon = self._icons[key] = self._load(key[0], dpr)
+        return icon
+
+    def findPath(self, name):
+        """查找图标文件"""
+        path = assets.path(f"{name}.png")
+        if path is None:
+            print(f"警告: 无法找到任何可用图标 for '{name}'")
+        return path
+
+    def _load(self, name, dpr):
+        path = self.findPath(name)
+        if path is None:
+            return None
+        pixmap = QPixmap(path)
+        if pixmap.isNull():
+            print(f"设置图标失败: 无法解码 {path}")
+            return None
+        self.decodes += 1
+        # 按设备像素比预先缩放出托盘常用的几种尺寸，显示时不再缩放
+        icon = QIcon(pixmap)
+        for logical in TRAY_ICON_SIZES:
+            size = round(logical * dpr)
+            if size < pixmap.width():
+                icon.addPixmap(pixmap.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation))
+        return icon
+
+
+class TBProgressIconAtlas:
+    """托盘进度图标的帧图集
+
+    在 tomato-filled.png 上叠加表示剩余时间比例的圆环，每个状态一种配色。
+    某个状态第一次开始时一次性渲染全部帧，之后每次刷新只是换一个缓存的 QIcon。
+    """
+    def __init__(self, iconCache, steps=PROGRESS_STEPS, size=PROGRESS_ICON_SIZE):
+        self.iconCache = iconCache
+        self.steps = steps
+        self.size = size
+        self._frames = {}  # (name, dpr) -> 帧列表，下标为剩余步数
+        self._bases = {}  # dpr -> 缩放好的番茄底图
+        self.renders = 0  # 本次会话渲染的帧数
+
+    def frames(self, name, dpr=1.0):
+        """取得某状态的全部帧，第 i 帧表示剩余 i/steps，不支持的状态返回 None"""
+        key = (name, dpr)
+        frames = self._frames.get(key)
+        if frames is None and name in PROGRESS_COLORS:
+            frames = self._frames[key] = self._render(name, dpr)
+        return frames
+
+    def _base(self, dpr):
+        base = self._bases.get(dpr)
+        if base is None:
+            path = self.iconCache.findPath("tomato-filled")
+            px = round(self.size * dpr)
+            base = QPixmap(path) if path else QPixmap()
+            if not base.isNull():
+                base = base.scaled(px, px, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            self._bases[dpr] = base
+        return base
+
+    def _render(self, name, dpr):
+        base = self._base(dpr)
+        color = QColor(PROGRESS_COLORS[name])
+        track = QColor(color)
+        track.setAlpha(70)
+        px = round(self.size * dpr)
+        pen_width = px * 0.14
+        inset = pen_width / 2
+        ring = QRectF(inset, inset, px - pen_width, px - pen_width)
+
+        frames = []
+        for step in range(self.steps + 1):
+            pixmap = QPixmap(px, px)
+            pixmap.fill(Qt.transparent)
+            painter = QPainter(pixmap)
+            painter.setRenderHint(QPainter.Antialiasing)
+            if not base.isNull():
+                painter.setOpacity(0.45)
+                painter.drawPixmap((px - base.width()) // 2, (px - base.height()) // 2, base)
+                painter.setOpacity(1.0)
+            painter.setBrush(Qt.NoBrush)
+            painter.setPen(QPen(track, pen_width))
+            painter.drawEllipse(ring)
+            if step:
+                pen = QPen(color, pen_width)
+                pen.setCapStyle(Qt.FlatCap)
+                painter.setPen(pen)
+                # 从 12 点方向顺时针画出剩余部分，角度单位为 1/16 度
+                painter.drawArc(ring, 90 * 16, -round(step / self.steps * 360 * 16))
+            painter.end()
+            pixmap.setDevicePixelRatio(dpr)
+            frames.append(QIcon(pixmap))
+        self.renders += len(frames)
+        return frames
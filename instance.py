@@ -0,0 +1,265 @@
+"""单实例保护和命令转发
+
+第一个启动的进程在本地套接字（Windows 上是命名管道）上监听；之后的启动
+先尝试连接，连上就把命令行动作转交给已运行的实例然后退出。
+客户端只依赖 QtCore/QtNetwork，不导入 QtWidgets 和 QtMultimedia。
+
+协议为 JSON Lines：每个请求、每个应答各占一行 UTF-8 JSON。
+  请求 {"command": "startStop"}
+  应答 {"ok": true, "state": "work", "timeLeft": "24:59", "running": true}
+
+命令：
+  startStop / skipRest / status / show
+  settings                            - 读取全部设置
+  set {"key": ..., "value": ...}      - 修改一项设置
+  subscribe {"interval": 秒, "events": ["tick", "transition"]}
+                                      - 之后推送 {"event": "tick", ...} 和
+                                        {"event": "transition", ...}，tick 按 interval 粒度
+  unsubscribe
+"""
+import getpass
+import json
+import math
+import sys
+
+from PySide6.QtCore import QObject
+from PySide6.QtNetwork import QLocalServer, QLocalSocket
+
+from publisher import formatSeconds
+
+# 命令行参数到命令的映射
+COMMAND_OPTIONS = {
+    "--start-stop": "startStop",
+    "--skip-rest": "skipRest",
+    "--status": "status",
+}
+# 客户端连接和等待应答的超时（毫秒）
+CLIENT_TIMEOUT = 500
+# 单行请求的长度上限，防止异常客户端占用内存
+MAX_LINE = 64 * 1024
+# 订阅者未读走的数据超过这个大小时断开，避免慢客户端拖累界面线程
+MAX_BACKLOG = 256 * 1024
+# 订阅的推送粒度范围（秒），剩余时间以整秒发布，更细没有意义
+MIN_SUBSCRIBE_INTERVAL = 1
+MAX_SUBSCRIBE_INTERVAL = 3600
+SUBSCRIBE_EVENTS = ("tick", "transition")
+
+
+def serverName():
+    """每个用户一个实例"""
+    try:
+        return f"TomatoBar-{getpass.getuser()}"
+    except Exception:
+        return "TomatoBar"
+
+
+def parseCommand(argv):
+    """从命令行参数中取出命令，没有时返回 None"""
+    for arg in argv[1:]:
+        if arg in COMMAND_OPTIONS:
+            return COMMAND_OPTIONS[arg]
+    return None
+
+
+def sendCommand(command, timeout=CLIENT_TIMEOUT, **fields):
+    """把命令发给已运行的实例，返回应答；没有实例在运行时返回 None"""
+    socket = QLocalSocket()
+    socket.connectToServer(serverName())
+    if not socket.waitForConnected(timeout):
+        return None
+    try:
+        request = dict(fields, command=command)
+        socket.write(json.dumps(request).encode("utf-8") + b"\n")
+        socket.flush()
+        while not socket.canReadLine():
+            if not socket.waitForReadyRead(timeout):
+                return {"ok": False, "error": "timeout"}
+        return json.loads(bytes(socket.readLine()).decode("utf-8"))
+    except ValueError as e:
+        return {"ok": False, "error": str(e)}
+    finally:
+        socket.disconnectFromServer()
+
+
+class TBTickGroup:
+    """按同一粒度订阅剩余时间的客户端，共用一个发布通道"""
+    __slots__ = ("interval", "channel", "clients")
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.channel = None
+        self.clients = set()
+
+
+class TBInstanceServer(QObject):
+    """运行中的实例上的命令服务器
+
+    命令通过 addCommand 注册，处理函数接收 (请求字典, 客户端套接字)，
+    可以返回一个字典合并进应答；每个成功的应答都带上 status() 给出的当前状态。
+
+    订阅按推送粒度分组，每组在计时器的发布层上只占一个通道：
+    剩余时间跨过一个粒度时只编码一次消息，再原样写给组内所有客户端。
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.server = QLocalServer(self)
+        self.server.newConnection.connect(self.onNewConnection)
+        self.commands = {}
+        self.status = dict  # 由应用替换为返回当前状态的函数
+        self.requests = 0  # 本次会话处理的请求数
+        self.pushes = 0  # 本次会话推送的消息数（每条只编码一次）
+
+        self.timer = None
+        self.subscribers = {}  # 客户端 -> (粒度, 事件集合)
+        self.tickGroups = {}  # 粒度 -> TBTickGroup
+        self.addCommand("subscribe", self.subscribe)
+        self.addCommand("unsubscribe", self.unsubscribe)
+
+    def attachTimer(self, timer):
+        """开始向订阅者推送这个计时器的状态转换和剩余时间"""
+        self.timer = timer
+        timer.stateChanged.connect(self.onStateChanged)
+
+    def listen(self):
+        """开始监听；已有实例在运行时返回 False"""
+        name = serverName()
+        # 只有当前用户可以连接，不依赖 umask
+        self.server.setSocketOptions(QLocalServer.UserAccessOption)
+        if self.server.listen(name):
+            return True
+        # 名字被占用：要么真的有实例在运行，要么是上次崩溃留下的套接字文件
+        if sendCommand("status") is not None:
+            return False
+        QLocalServer.removeServer(name)
+        if not self.server.listen(name):
+            print(f"启动命令服务器失败: {self.server.errorString()}")
+        return True
+
+    def close(self):
+        self.server.close()
+
+    def addCommand(self, name, handler):
+        self.commands[name] = handler
+
+    def onNewConnection(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            socket.readyRead.connect(lambda socket=socket: self.onReadyRead(socket))
+            socket.disconnected.connect(lambda socket=socket: self.onDisconnected(socket))
+
+    def onDisconnected(self, socket):
+        self.dropSubscriber(socket)
+        socket.deleteLater()
+
+    def onReadyRead(self, socket):
+        while socket.canReadLine():
+            line = bytes(socket.readLine())
+            socket.write(json.dumps(self.handleLine(line, socket)).encode("utf-8") + b"\n")
+        if socket.bytesAvailable() > MAX_LINE:
+            socket.abort()
+
+    def handleLine(self, line, client=None):
+        try:
+            request = json.loads(line.decode("utf-8"))
+            if not isinstance(request, dict):
+                raise ValueError("请求必须是 JSON 对象")
+        except ValueError as e:
+            return {"ok": False, "error": f"无效的请求: {e}"}
+        return self.handleRequest(request, client)
+
+    def handleRequest(self, request, client=None):
+        """执行一个请求并生成应答"""
+        self.requests += 1
+        command = request.get("command")
+        handler = self.commands.get(command)
+        if handler is None:
+            return {"ok": False, "error": f"未知的命令: {command}"}
+        try:
+            result = handler(request, client)
+        except Exception as e:
+            print(f"执行命令 {command} 失败: {e}")
+            return {"ok": False, "error": str(e)}
+        response = {"ok": True}
+        response.update(self.status())
+        if result:
+            response.update(result)
+        return response
+
+    def subscribe(self, request, client):
+        """订阅推送，重复订阅会替换之前的设置"""
+        if client is None or self.timer is None:
+            raise ValueError("只有已连接的客户端可以订阅")
+        events = request.get("events") or SUBSCRIBE_EVENTS
+        unknown = set(events) - set(SUBSCRIBE_EVENTS)
+        if unknown:
+            raise ValueError(f"未知的事件: {', '.join(sorted(unknown))}")
+        interval = float(request.get("interval", MIN_SUBSCRIBE_INTERVAL))
+        if not math.isfinite(interval):
+            raise ValueError(f"无效的推送粒度: {interval}")
+        interval = float(min(max(interval, MIN_SUBSCRIBE_INTERVAL), MAX_SUBSCRIBE_INTERVAL))
+        if interval.is_integer():
+            interval = int(interval)
+
+        self.dropSubscriber(client)
+        events = frozenset(events)
+        self.subscribers[client] = (interval, events)
+        if "tick" in events:
+            group = self.tickGroups.get(interval)
+            if group is None:
+                group = self.tickGroups[interval] = TBTickGroup(interval)
+                group.channel = self.timer.addTimeLeftChannel(
+                    lambda text, group=group: self.publishTick(group), granularity=interval)
+            group.clients.add(client)
+        return {"subscribed": sorted(events), "interval": interval}
+
+    def unsubscribe(self, request, client):
+        self.dropSubscriber(client)
+
+    def dropSubscriber(self, client):
+        subscription = self.subscribers.pop(client, None)
+        if subscription is None:
+            return
+        group = self.tickGroups.get(subscription[0])
+        if group and client in group.clients:
+            group.clients.discard(client)
+            if not group.clients:
+                del self.tickGroups[group.interval]
+                self.timer.removeTimeLeftChannel(group.channel)
+
+    def publishTick(self, group):
+        """剩余时间跨过组的粒度时推送"""
+        remaining = self.timer.publisher.totalSeconds
+        self.push(group.clients, {"event": "tick", "remaining": remaining, "timeLeft": formatSeconds(remaining)})
+
+    def onStateChanged(self, state):
+        clients = [client for client, (_, events) in self.subscribers.items() if "transition" in events]
+        if clients:
+            message = {"event": "transition"}
+            message.update(self.status())
+            self.push(clients, message)
+
+    def push(self, clients, message):
+        """编码一次，写给所有客户端；积压过多的客户端直接断开"""
+        line = json.dumps(message).encode("utf-8") + b"\n"
+        self.pushes += 1
+        for client in list(clients):
+            if client.bytesToWrite() > MAX_BACKLOG:
+                print("订阅者读取过慢，断开连接")
+                client.abort()
+                continue
+            client.write(line)
+
+
+def forward(command):
+    """把命令转交给已运行的实例
+
+    返回进程退出码；没有实例在运行时返回 None，由调用方正常启动。
+    """
+    response = sendCommand(command or "show")
+    if response is None:
+        return None
+    if command == "status" or not response.get("ok"):
+        out = sys.stdout if response.get("ok") else sys.stderr
+        if out:
+            print(json.dumps(response, ensure_ascii=False), file=out)
+    return 0 if response.get("ok") else 1
@@ -0,0 +1,122 @@
+import json
+import marshal
+import os
+
+from PySide6.QtCore import QFile, QIODevice, QTranslator
+
+# 编译缓存的格式版本，格式变化时递增使旧缓存失效
+CACHE_VERSION = 1
+
+
+def defaultCacheDir():
+    """与 TomatoBar.log 放在同一个缓存目录"""
+    from log import logger
+    return os.path.dirname(logger.log_path)
+
+
+def compileCatalog(data):
+    """把 JSON 目录展开为 {(上下文, 原文): 译文}
+
+    支持两种写法：
+      {"Start": "开始", ...}                       - 不区分上下文，上下文记为 ""
+      {"TBPopoverView": {"Start": "开始"}, ...}    - 按类名（tr 的上下文）分组
+    """
+    messages = {}
+    for key, value in data.items():
+        if isinstance(value, dict):
+            for source, text in value.items():
+                if isinstance(text, str) and text:
+                    messages[(key, source)] = text
+        elif isinstance(value, str) and value:
+            messages[("", key)] = value
+    return messages
+
+
+class TBJsonTranslator(QTranslator):
+    """从 localization/*.json 加载译文的 QTranslator
+
+    第一次加载时解析 JSON 并把展开后的查找表用 marshal 写入缓存目录，
+    之后的启动只要源文件的修改时间和大小没变，就直接读缓存，跳过 JSON 解析。
+    """
+    def __init__(self, parent=None, cacheDir=None):
+        super().__init__(parent)
+        self.cacheDir = cacheDir
+        self.messages = {}
+        self.language = ""
+        self.fromCache = False  # 本次加载是否命中缓存
+
+    def loadJson(self, path, language=None):
+        """加载一个 JSON 目录，成功返回 True"""
+        self.language = language or os.path.splitext(os.path.basename(path))[0]
+        if path.startswith(":/"):
+            # 编译进资源包的文件随程序一起更新，不需要缓存
+            messages = self._parseResource(path)
+        else:
+            messages = self._loadCached(path)
+        if messages is None:
+            return False
+        self.messages = messages
+        return True
+
+    def _parseResource(self, path):
+        f = QFile(path)
+        if not f.open(QIODevice.ReadOnly):
+            print(f"加载翻译失败: 无法打开 {path}")
+            return None
+        try:
+            return compileCatalog(json.loads(bytes(f.readAll()).decode("utf-8")))
+        except ValueError as e:
+            print(f"加载翻译失败: {e}")
+            return None
+        finally:
+            f.close()
+
+    def _cachePath(self):
+        cache_dir = self.cacheDir or defaultCacheDir()
+        return os.path.join(cache_dir, f"TomatoBar.{self.language}.l10n")
+
+    def _loadCached(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            print(f"加载翻译失败: {e}")
+            return None
+        stamp = (CACHE_VERSION, stat.st_mtime_ns, stat.st_size)
+
+        cache_path = self._cachePath()
+        try:
+            with open(cache_path, "rb") as f:
+                cached_stamp, messages = marshal.load(f)
+            if cached_stamp == stamp:
+                self.fromCache = True
+                return messages
+        except (OSError, EOFError, ValueError, TypeError):
+            pass  # 没有缓存或缓存损坏，重新解析
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                messages = compileCatalog(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"加载翻译失败: {e}")
+            return None
+
+        try:
+            # 先写临时文件再替换，避免并发启动读到半个缓存
+            temp_path = cache_path + ".tmp"
+            with open(temp_path, "wb") as f:
+                marshal.dump((stamp, messages), f)
+            os.replace(temp_path, cache_path)
+        except OSError as e:
+            print(f"写入翻译缓存失败: {e}")
+        return messages
+
+    def isEmpty(self):
+        return not self.messages
+
+    def translate(self, context, sourceText, disambiguation=None, n=-1):
+        messages = self.messages
+        text = messages.get((context, sourceText))
+        if text is None:
+            text = messages.get(("", sourceText))
+        # 返回空字符串时 Qt 使用原文
+        return text or ""
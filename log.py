@@ -1,8 +1,13 @@
 import os
 import json
+import queue
+import threading
+import time
 from datetime import datetime
 from PySide6.QtCore import QObject, QStandardPaths
 
+from metrics import metrics
+
 # 全局日志记录器
 logger = None
 
@@ -41,8 +46,17 @@ class TBLogEventTransition(TBLogEvent):
         return data
 
 class TBLogger:
-    """日志记录器"""
-    def __init__(self):
+    """日志记录器
+
+    append 只把事件放进有界队列，由后台线程批量写入同一个长期打开的文件句柄，
+    避免在 GUI 线程上做磁盘 I/O。队列满时丢弃新事件并计数。
+    """
+    # 队列中的结束标记
+    _STOP = object()
+    # 队列中的 flush 标记：写入线程处理到它时立即 flush（和 fsync）再确认
+    _FLUSH = object()
+
+    def __init__(self, queueSize=1024, batchSize=256, flushInterval=1.0, fsync=False):
         # 确定日志文件路径
         cache_dir = QStandardPaths.writableLocation(QStandardPaths.CacheLocation)
         if not cache_dir:
@@ -52,18 +66,154 @@ class TBLogger:
         os.makedirs(cache_dir, exist_ok=True)
         
         self.log_path = os.path.join(cache_dir, "TomatoBar.log")
-    
+
+        # 写入策略：flushInterval 为两次 flush 的最长间隔（0 表示每批都 flush），
+        # fsync 为 True 时每次 flush 后同步到磁盘
+        self.batchSize = batchSize
+        self.flushInterval = flushInterval
+        self.fsync = fsync
+
+        # 计数器
+        self.dropped = 0
+        self.written = 0
+
+        self._queue = queue.Queue(maxsize=queueSize)
+        self._thread = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    @property
+    def queueDepth(self):
+        """当前等待写入的事件数"""
+        return self._queue.qsize()
+
     def append(self, event):
         """添加日志事件"""
+        if metrics.enabled:
+            start = time.perf_counter()
+            self._append(event)
+            metrics.logAppend.observe(time.perf_counter() - start)
+        else:
+            self._append(event)
+
+    def _append(self, event):
+        if self._closed:
+            # 退出后的零星事件直接同步写入
+            self._writeLines([self._encode(event.to_dict())])
+            return
+        self._ensureThread()
+        try:
+            self._queue.put_nowait(event.to_dict())
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """阻塞直到队列中已有的事件全部写入文件（fsync 为 True 时同步到磁盘）"""
+        if self._thread and not self._closed:
+            self._queue.put(self._FLUSH)
+            self._queue.join()
+
+    def close(self, timeout=2.0):
+        """写完剩余事件并关闭文件，连接到 QApplication.aboutToQuit"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread:
+            # 磁盘卡住导致队列满时不能让退出流程一直阻塞在界面线程上
+            try:
+                self._queue.put(self._STOP, timeout=timeout)
+            except queue.Full:
+                print("日志队列已满，放弃写入剩余事件")
+                return
+            thread.join(timeout)
+
+    def _ensureThread(self):
+        if self._thread:
+            return
+        with self._lock:
+            if not self._thread:
+                self._thread = threading.Thread(target=self._run, name="TBLogger", daemon=True)
+                self._thread.start()
+
+    @staticmethod
+    def _encode(data):
+        return json.dumps(data, sort_keys=True) + "\n"
+
+    def _writeLines(self, lines):
         try:
-            # 转换事件为JSON
-            event_json = json.dumps(event.to_dict(), sort_keys=True)
-            
-            # 追加到日志文件
             with open(self.log_path, "a", encoding="utf-8") as f:
-                f.write(event_json + "\n")
+                f.writelines(lines)
+            self.written += len(lines)
         except Exception as e:
             print(f"日志记录失败: {e}")
 
+    def _run(self):
+        """写入线程：攒批写入，按策略 flush / fsync"""
+        handle = None
+        last_flush = time.monotonic()
+        pending = False  # 已写入缓冲区但还没有 flush
+        stopping = False
+        while not stopping:
+            # 没有待 flush 的数据时一直阻塞，空闲时不会周期性唤醒；
+            # 有待 flush 的数据时最多等到下一次 flush 的时刻
+            timeout = None
+            if pending:
+                timeout = max(0.0, last_flush + self.flushInterval - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            batch = []
+            taken = 0
+            force = False
+            while item is not None:
+                taken += 1
+                if item is self._STOP:
+                    stopping = True
+                    break
+                if item is self._FLUSH:
+                    force = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.batchSize:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+
+            try:
+                if batch:
+                    if handle is None:
+                        handle = open(self.log_path, "a", encoding="utf-8")
+                    handle.writelines(self._encode(data) for data in batch)
+                    self.written += len(batch)
+                    pending = True
+                now = time.monotonic()
+                if handle and pending and (stopping or force or not self.flushInterval
+                                           or now - last_flush >= self.flushInterval):
+                    handle.flush()
+                    if self.fsync:
+                        os.fsync(handle.fileno())
+                    last_flush = now
+                    pending = False
+            except Exception as e:
+                print(f"日志记录失败: {e}")
+                pending = False
+                if handle:
+                    handle.close()
+                    handle = None
+
+            # 处理完之后再标记完成；flush() 的标记排在它之前的事件后面，
+            # 确认它时这些事件已经 flush 到文件
+            for _ in range(taken):
+                self._queue.task_done()
+
+        if handle:
+            handle.close()
+
 # 初始化全局日志记录器
 logger = TBLogger()
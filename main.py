@@ -1,13 +1,34 @@
 import sys
 import os
-from PySide6.QtWidgets import QApplication
+from profiler import trace
+
+# 只依赖 QtCore/QtNetwork，转发命令时不会加载界面相关模块
+from instance import parseCommand, forward
 
 
 def main():
+    # 已有实例在运行时把命令行动作转交给它，然后直接退出
+    command = parseCommand(sys.argv)
+    with trace.phase("forward to running instance"):
+        code = forward(command)
+    if code is not None:
+        return code
+    if command == "status":
+        print("TomatoBar is not running", file=sys.stderr)
+        return 1
+
+    with trace.phase("import PySide6.QtWidgets"):
+        from PySide6.QtWidgets import QApplication
 
         # 导入应用类并启动
-    from app import TBApp
+    with trace.phase("import app"):
+        from app import TBApp
     app = TBApp(sys.argv)
+    if app.alreadyRunning:
+        # 另一个进程抢先完成了启动，命令已经转交
+        return 0
+    if command:
+        app.server.handleRequest({"command": command})
     
     return app.exec()
 
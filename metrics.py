@@ -0,0 +1,197 @@
+import bisect
+import os
+import threading
+import time
+
+# 设置为端口号或 "地址:端口" 时启用指标，例如 TOMATOBAR_METRICS=9464
+METRICS_ENV = "TOMATOBAR_METRICS"
+DEFAULT_HOST = "127.0.0.1"
+
+# 延迟类指标的桶边界（秒）
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# 事件循环延迟检测的间隔（毫秒）
+LAG_PROBE_INTERVAL = 100
+
+
+class TBHistogram:
+    """Prometheus 风格的累积直方图，可按一个标签分组
+
+    只在界面线程上写入；HTTP 线程读取时可能看到相差一次观测的计数，对监控无影响。
+    """
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS, label=None):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.label = label
+        self._series = {}  # 标签值 -> [各桶计数..., 总和]
+
+    def observe(self, value, labelValue=""):
+        series = self._series.get(labelValue)
+        if series is None:
+            series = self._series[labelValue] = [0] * (len(self.buckets) + 1) + [0.0]
+        # 每次只加一个桶，渲染时再累加
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.help}")
+        lines.append(f"# TYPE {self.name} histogram")
+        for labelValue, series in sorted(dict(self._series).items()):
+            series = list(series)
+            prefix = f'{self.label}="{labelValue}",' if self.label else ""
+            total = 0
+            for bound, count in zip(self.buckets, series):
+                total += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {total}')
+            total += series[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {total}')
+            labels = f"{{{prefix[:-1]}}}" if prefix else ""
+            lines.append(f"{self.name}_sum{labels} {series[-1]}")
+            lines.append(f"{self.name}_count{labels} {total}")
+
+
+class TBMetrics:
+    """可选的运行时指标
+
+    默认关闭，关闭时各处的埋点只是一次 metrics.enabled 判断，
+    状态机处理器也只有在启用时才会被包上计时。启用后在本地 HTTP 端口上以
+    Prometheus 文本格式提供 /metrics。
+    """
+    def __init__(self):
+        self.enabled = False
+        self.tickJitter = TBHistogram(
+            "tomatobar_tick_jitter_seconds", "Delay between a scheduled wakeup and the actual wakeup")
+        self.fireDelay = TBHistogram(
+            "tomatobar_fire_delay_seconds", "Delay between the interval deadline and TIMER_FIRED")
+        self.handlerLatency = TBHistogram(
+            "tomatobar_handler_latency_seconds", "Time from the start of a transition to the start of a handler",
+            label="handler")
+        self.handlerDuration = TBHistogram(
+            "tomatobar_handler_duration_seconds", "Time spent inside a state machine handler", label="handler")
+        self.logAppend = TBHistogram(
+            "tomatobar_log_append_seconds", "Duration of TBLogger.append on the GUI thread")
+        self.eventLoopLag = TBHistogram(
+            "tomatobar_event_loop_lag_seconds", "How late a periodic probe timer runs on the Qt event loop")
+        self.histograms = [self.tickJitter, self.fireDelay, self.handlerLatency, self.handlerDuration,
+                           self.logAppend, self.eventLoopLag]
+        self.gauges = []  # (名称, 说明, 取值函数, 类型)
+        self.transitionStart = 0.0
+        self.server = None
+        self._probe = None
+        self._probeLast = 0.0
+
+    def addGauge(self, name, help, getter):
+        """注册一个在抓取时读取的数值"""
+        self.gauges.append((name, help, getter, "gauge"))
+
+    def addCounter(self, name, help, getter):
+        """注册一个在抓取时读取的单调递增计数，名称按惯例以 _total 结尾"""
+        self.gauges.append((name, help, getter, "counter"))
+
+    def startFromEnvironment(self):
+        """环境变量设置了端口时启用"""
+        value = os.environ.get(METRICS_ENV)
+        if not value:
+            return False
+        host, _, port = value.rpartition(":")
+        try:
+            return self.start(host or DEFAULT_HOST, int(port))
+        except ValueError:
+            print(f"指标端口无效: {value}")
+            return False
+
+    def start(self, host=DEFAULT_HOST, port=9464):
+        """启用指标并在后台线程上提供 HTTP 端点"""
+        # 只在启用时才导入 http.server，关闭时不增加启动的导入耗时
+        from http.server import HTTPServer
+        try:
+            self.server = HTTPServer((host, port), _metricsHandler())
+        except OSError as e:
+            print(f"启动指标服务失败: {e}")
+            return False
+        self.server.metrics = self
+        threading.Thread(target=self.server.serve_forever, name="TBMetrics", daemon=True).start()
+        self.enabled = True
+        self._startLagProbe()
+        return True
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        if self._probe:
+            self._probe.stop()
+            self._probe = None
+        self.enabled = False
+
+    def _startLagProbe(self):
+        from PySide6.QtCore import QTimer, Qt
+        self._probe = QTimer()
+        self._probe.setTimerType(Qt.PreciseTimer)
+        self._probe.timeout.connect(self._onProbe)
+        self._probeLast = time.perf_counter()
+        self._probe.start(LAG_PROBE_INTERVAL)
+
+    def _onProbe(self):
+        now = time.perf_counter()
+        self.eventLoopLag.observe(max(0.0, now - self._probeLast - LAG_PROBE_INTERVAL / 1000))
+        self._probeLast = now
+
+    def timedHandler(self, handler):
+        """包装状态机处理器，记录转换开始到处理器开始的延迟和处理器耗时
+
+        转换开始时刻由状态机在分发事件时写入 transitionStart。
+        """
+        name = getattr(handler, "__name__", None) or repr(handler)
+
+        def timed(*args):
+            start = time.perf_counter()
+            self.handlerLatency.observe(start - self.transitionStart, name)
+            try:
+                return handler(*args)
+            finally:
+                self.handlerDuration.observe(time.perf_counter() - start, name)
+        timed.__name__ = name
+        return timed
+
+    def render(self):
+        """Prometheus 文本格式"""
+        lines = []
+        for histogram in self.histograms:
+            histogram.render(lines)
+        for name, help, getter, kind in self.gauges:
+            try:
+                value = getter()
+            except Exception:
+                continue
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _metricsHandler():
+    """/metrics 的请求处理类，随 http.server 一起延迟创建"""
+    from http.server import BaseHTTPRequestHandler
+
+    class _MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = self.server.metrics.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return _MetricsHandler
+
+
+# 全局指标
+metrics = TBMetrics()
@@ -1,89 +1,148 @@
-import os
-from PySide6.QtCore import QObject, QSettings, QUrl
-from PySide6.QtMultimedia import QMediaPlayer, QAudioOutput
+from PySide6.QtCore import QObject, QTimer
+
+from assets import assets
+from profiler import trace
+from settings import settings as sharedSettings
+
 
 class TBPlayer(QObject):
-    def __init__(self):
+    """音效播放器
+
+    声音在第一次播放时解码为内存中的 PCM，之后通过同一个混音输出播放。
+    音频输出（以及 QtMultimedia 的导入）推迟到第一次真正发声时，
+    音量为 0 的声音不会解码也不会播放，空闲超过 idleTimeout 秒后关闭输出。
+    """
+    def __init__(self, settings=None):
         super().__init__()
-        self.settings = QSettings("TomatoBar", "TomatoBar")
-        
-        # 创建音频播放器
-        self.windupSound = self._createAudioPlayer("windup.wav")
-        self.dingSound = self._createAudioPlayer("ding.wav")
-        self.tickingSound = self._createAudioPlayer("ticking.wav")
-        
+        self.settings = settings if settings is not None else sharedSettings
+
         # 加载音量设置
-        self.windupVolume = self.settings.value("windupVolume", 1.0, float)
-        self.dingVolume = self.settings.value("dingVolume", 1.0, float)
-        self.tickingVolume = self.settings.value("tickingVolume", 1.0, float)
-        
-        # 设置音量
-        self._setVolume(self.windupSound, self.windupVolume)
-        self._setVolume(self.dingSound, self.dingVolume)
-        self._setVolume(self.tickingSound, self.tickingVolume)
-    
-    def _createAudioPlayer(self, filename):
-        """创建音频播放器"""
-        # 检查文件是否存在
-        for path in [
-            f"Assets/{os.path.splitext(filename)[0]}.dataset/{filename}",  # 原版结构
-            f"Assets/{filename}",  # 备用位置
-            f"sounds/{filename}"  # 备用位置
-        ]:
-            if os.path.exists(path):
-                player = QMediaPlayer()
-                audio_output = QAudioOutput()
-                player.setAudioOutput(audio_output)
-                player.setSource(QUrl.fromLocalFile(os.path.abspath(path)))
-                return {"player": player, "audio": audio_output}
-        
-        print(f"警告: 找不到音频文件 {filename}")
-        return None
-    
-    def _setVolume(self, sound, volume):
-        """设置音频播放器的音量"""
-        if sound:
-            sound["audio"].setVolume(volume)
-    
+        self.windupVolume = self.settings.windupVolume
+        self.dingVolume = self.settings.dingVolume
+        self.tickingVolume = self.settings.tickingVolume
+
+        # 空闲多少秒后关闭音频输出，0 表示不关闭
+        self.idleTimeout = self.settings.audioIdleTimeout
+        self.settings.changed.connect(self.onSettingChanged)
+
+        self.engine = None
+        self._sounds = {}  # 文件名 -> TBPcmSound
+        self._missing = set()  # 找不到的文件，避免重复探测
+        self._ticking = None  # 滴答声的 voice
+        self.created = 0  # 本次会话创建音频输出的次数
+        self.decodes = 0  # 本次会话解码 WAV 的次数
+
+        self._idleTimer = QTimer(self)
+        self._idleTimer.setSingleShot(True)
+        self._idleTimer.timeout.connect(self._releaseIdle)
+
+        # 拖动滑块时只在停下后才把新音量应用到正在播放的滴答声
+        self._tickingGainTimer = QTimer(self)
+        self._tickingGainTimer.setSingleShot(True)
+        self._tickingGainTimer.setInterval(150)
+        self._tickingGainTimer.timeout.connect(self._applyTickingVolume)
+
+    def _loadSound(self, filename):
+        """取得解码后的声音，只解码一次"""
+        sound = self._sounds.get(filename)
+        if sound is None and filename not in self._missing:
+            if assets.path(filename) is None:
+                print(f"警告: 找不到音频文件 {filename}")
+                self._missing.add(filename)
+                return None
+            from audio import decodeWav
+            try:
+                with assets.open(filename) as f:
+                    sound = decodeWav(f, filename)
+            except Exception as e:
+                print(f"解码音频失败 {filename}: {e}")
+                self._missing.add(filename)
+                return None
+            self.decodes += 1
+            self._sounds[filename] = sound
+        return sound
+
+    def _play(self, filename, volume, loop=False):
+        """播放声音，音量为 0 或文件缺失时返回 None"""
+        if volume <= 0:
+            return None
+        sound = self._loadSound(filename)
+        if sound is None:
+            return None
+        if self.engine is None:
+            with trace.phase("import PySide6.QtMultimedia"):
+                from audio import TBSoundEngine
+            self.engine = TBSoundEngine()
+            self.created += 1
+        voice = self.engine.play(sound, volume, loop)
+        self._scheduleRelease()
+        return voice
+
+    def _scheduleRelease(self):
+        if self.idleTimeout > 0:
+            self._idleTimer.start(self.idleTimeout * 1000)
+
+    def _releaseIdle(self):
+        """没有声音在播放时关闭音频输出"""
+        if self.engine is None:
+            return
+        if not self.engine.isIdle():
+            self._scheduleRelease()
+            return
+        self.engine.close()
+        self.engine.deleteLater()
+        self.engine = None
+
     def setWindupVolume(self, volume):
         """设置发条声音量"""
-        self.windupVolume = volume
         self.settings.setValue("windupVolume", volume)
-        self._setVolume(self.windupSound, volume)
-    
+
     def setDingVolume(self, volume):
         """设置叮声音量"""
-        self.dingVolume = volume
         self.settings.setValue("dingVolume", volume)
-        self._setVolume(self.dingSound, volume)
-    
+
     def setTickingVolume(self, volume):
         """设置滴答声音量"""
-        self.tickingVolume = volume
         self.settings.setValue("tickingVolume", volume)
-        self._setVolume(self.tickingSound, volume)
-    
+
+    def onSettingChanged(self, key, value):
+        """共享设置变化时更新音量"""
+        if key == "windupVolume":
+            self.windupVolume = value
+        elif key == "dingVolume":
+            self.dingVolume = value
+        elif key == "audioIdleTimeout":
+            self.idleTimeout = value
+        elif key == "tickingVolume":
+            self.tickingVolume = value
+            if not self._ticking:
+                return
+            if value <= 0:
+                self.stopTicking()
+            else:
+                self._tickingGainTimer.start()
+
+    def _applyTickingVolume(self):
+        if self._ticking and self.engine:
+            self.engine.setGain(self._ticking, self._sounds["ticking.wav"], self.tickingVolume)
+
     def playWindup(self):
         """播放发条声"""
-        if self.windupSound and self.windupVolume > 0:
-            self.windupSound["player"].setPosition(0)
-            self.windupSound["player"].play()
-    
+        self._play("windup.wav", self.windupVolume)
+
     def playDing(self):
         """播放叮声"""
-        if self.dingSound and self.dingVolume > 0:
-            self.dingSound["player"].setPosition(0)
-            self.dingSound["player"].play()
-    
+        self._play("ding.wav", self.dingVolume)
+
     def startTicking(self):
-        """开始播放滴答声"""
-        if self.tickingSound and self.tickingVolume > 0:
-            self.tickingSound["player"].setLoops(QMediaPlayer.Infinite)
-            self.tickingSound["player"].play()
-    
+        """开始播放滴答声，循环无缝衔接"""
+        if self._ticking:
+            return
+        self._ticking = self._play("ticking.wav", self.tickingVolume, loop=True)
+
     def stopTicking(self):
         """停止播放滴答声"""
-        if self.tickingSound:
-            self.tickingSound["player"].stop()
-            # 确保停止后重置位置，避免下次播放从中间开始
-            self.tickingSound["player"].setPosition(0)
+        if self._ticking:
+            self.engine.stop(self._ticking)
+            self._ticking = None
+            self._scheduleRelease()
@@ -0,0 +1,82 @@
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+# 设置为 1 时把启动耗时打印到 stderr，设置为文件路径时写成 JSON
+TRACE_ENV = "TOMATOBAR_STARTUP_TRACE"
+# 设置后在启动完成（第一次进入事件循环）时直接退出，供基准测试使用
+EXIT_ENV = "TOMATOBAR_EXIT_AFTER_STARTUP"
+
+
+class TBStartupTrace:
+    """可选的启动耗时记录
+
+    未启用时 phase() 只是一个空的上下文管理器，mark() 直接返回。
+    时间均相对于本模块被导入的时刻（main.py 最先导入它）。
+    """
+    def __init__(self):
+        self.target = os.environ.get(TRACE_ENV)
+        self.enabled = bool(self.target)
+        self.origin = time.perf_counter()
+        self.phases = []  # (名称, 开始, 耗时, 嵌套深度)
+        self.marks = {}  # 名称 -> 时刻
+        self._depth = 0
+        self.finished = False
+
+    @contextmanager
+    def phase(self, name):
+        """记录一个阶段的开始时刻和耗时，可以嵌套"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            self.phases.append((name, start - self.origin, time.perf_counter() - start, self._depth))
+
+    def mark(self, name):
+        """记录一个时刻，同名只记第一次"""
+        if self.enabled and name not in self.marks:
+            self.marks[name] = time.perf_counter() - self.origin
+
+    def finish(self):
+        """启动完成：输出报告，必要时退出"""
+        if self.finished:
+            return
+        self.finished = True
+        self.mark("event loop running")
+        if self.enabled:
+            self.report()
+        if os.environ.get(EXIT_ENV):
+            from PySide6.QtWidgets import QApplication
+            QApplication.quit()
+
+    def report(self):
+        phases = sorted(self.phases, key=lambda phase: phase[1])
+        if self.target == "1":
+            out = sys.stderr
+            print("TomatoBar startup trace (ms)", file=out)
+            for name, start, duration, depth in phases:
+                print(f"  {start * 1000:8.1f} {duration * 1000:8.1f}  {'  ' * depth}{name}", file=out)
+            for name, at in sorted(self.marks.items(), key=lambda item: item[1]):
+                print(f"  {at * 1000:8.1f}        -  [{name}]", file=out)
+            return
+        data = {
+            "phases": [{"name": name, "start": start, "duration": duration, "depth": depth}
+                       for name, start, duration, depth in phases],
+            "marks": self.marks,
+        }
+        try:
+            with open(self.target, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+        except OSError as e:
+            print(f"写入启动记录失败: {e}")
+
+
+# 全局启动记录器
+trace = TBStartupTrace()
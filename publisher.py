@@ -0,0 +1,109 @@
+import math
+
+# 界面允许的最长间隔为 60 分钟，预先生成足够覆盖的格式化字符串
+MAX_TABLE_SECONDS = 60 * 60
+
+# 按秒索引的 "MM:SS"
+SECONDS_TABLE = tuple(f"{s // 60:02d}:{s % 60:02d}" for s in range(MAX_TABLE_SECONDS + 1))
+# 按分钟索引的 "N min"
+MINUTES_TABLE = tuple(f"{m} min" for m in range(MAX_TABLE_SECONDS // 60 + 1))
+
+
+def formatSeconds(total_seconds):
+    """整数秒格式化为 "MM:SS"，None 为空字符串"""
+    if total_seconds is None:
+        return ""
+    if total_seconds < len(SECONDS_TABLE):
+        return SECONDS_TABLE[total_seconds]
+    return f"{total_seconds // 60:02d}:{total_seconds % 60:02d}"
+
+
+class TBTimeLeftChannel:
+    """单个消费者的发布通道，按自己的粒度只在值变化时回调
+
+    不活动（例如界面不可见）的通道不接收发布，也不参与决定唤醒间隔。
+    """
+    __slots__ = ("callback", "granularity", "table", "lastKey", "active")
+
+    def __init__(self, callback, granularity, table, active=True):
+        self.callback = callback
+        self.granularity = granularity
+        self.table = table
+        self.lastKey = -1  # 与任何合法键都不同，保证首次发布
+        self.active = active
+
+    def publish(self, total_seconds):
+        if total_seconds is None:
+            key = None
+        else:
+            key = int(-(-total_seconds // self.granularity))  # 向上取整，粒度可以是小数
+        if key == self.lastKey:
+            return
+        self.lastKey = key
+        self.callback(self.format(key))
+
+    def format(self, key):
+        if key is None:
+            return ""
+        if key < len(self.table):
+            return self.table[key]
+        # 超出预计算范围时退回到即时格式化
+        if self.table is SECONDS_TABLE:
+            return formatSeconds(key)
+        if self.table is MINUTES_TABLE:
+            return f"{key} min"
+        # 自定义表（例如进度图标帧）取最后一项
+        return self.table[-1]
+
+    def invalidate(self):
+        self.lastKey = -1
+
+
+class TBTimeLeftPublisher:
+    """剩余时间发布层：只把真正的变化推送给各个消费者"""
+    def __init__(self):
+        self.channels = []
+        self.totalSeconds = None
+
+    def addChannel(self, callback, granularity=1, table=SECONDS_TABLE, active=True):
+        """注册消费者，granularity 为刷新粒度（秒）"""
+        channel = TBTimeLeftChannel(callback, granularity, table, active)
+        self.channels.append(channel)
+        return channel
+
+    def setActive(self, channel, active):
+        """启用或停用通道，重新启用时下一次发布一定会回调"""
+        channel.active = active
+        if active:
+            channel.invalidate()
+
+    def removeChannel(self, channel):
+        if channel in self.channels:
+            self.channels.remove(channel)
+        # 正在发布的快照里可能还有它，停用后不再回调
+        channel.active = False
+
+    def activeGranularities(self):
+        """活动通道各自的粒度（去重、升序），用于决定调度器的唤醒时刻；没有活动通道时为 None
+
+        不能只取最细的粒度：其他通道的边界不一定是它的整数倍，按最细粒度唤醒会让它们迟到。
+        """
+        granularities = sorted({channel.granularity for channel in self.channels if channel.active})
+        return tuple(granularities) if granularities else None
+
+    def publish(self, remaining):
+        """发布剩余秒数（浮点），None 表示计时器已停止"""
+        total_seconds = None if remaining is None else math.ceil(remaining)
+        self.totalSeconds = total_seconds
+        # 回调可能增删通道（例如推送失败的订阅者断开），遍历快照保证本次不漏掉其他通道
+        for channel in tuple(self.channels):
+            if channel.active:
+                channel.publish(total_seconds)
+
+    def refresh(self, channel=None):
+        """强制重新推送当前值，用于消费者自身配置变化的场合"""
+        targets = [channel] if channel else tuple(self.channels)
+        for target in targets:
+            target.invalidate()
+            if target.active:
+                target.publish(self.totalSeconds)
@@ -0,0 +1,143 @@
+import math
+import time
+from PySide6.QtCore import QObject, Qt, QTimer, Signal
+
+from metrics import metrics
+
+class TBSystemClock:
+    """系统时钟：monotonic 用于调度，time 为墙上时间（用于检测休眠超时）"""
+    monotonic = staticmethod(time.monotonic)
+    time = staticmethod(time.time)
+
+
+# 小于 1 毫秒的余量视为已经到达边界，避免为浮点误差多唤醒一次
+BOUNDARY_EPSILON = 0.001
+# 单调时钟在休眠期间停止，两次唤醒最多相隔这么久（秒），保证唤醒后能及时发现墙上时间已经超时。
+# 与托盘提示的粒度相同，默认设置下不会多出唤醒
+WALL_CHECK_INTERVAL = 60
+# 墙上时间比单调时钟多走超过这么多秒，视为期间发生过休眠
+SUSPEND_THRESHOLD = 1.0
+
+
+def nextWakeupDelay(remaining, tickInterval):
+    """计算下一次唤醒距现在的秒数
+
+    tickInterval 为 None 时直接等到截止时间；否则等到剩余时间跨过
+    下一个 tickInterval 整数倍的边界（即显示内容会变化的时刻）。
+    tickInterval 也可以是多个粒度，此时取各自下一个边界中最近的一个。
+    """
+    if remaining <= 0:
+        return 0.0
+    if not tickInterval:
+        return remaining
+    granularities = tickInterval if isinstance(tickInterval, (tuple, list)) else (tickInterval,)
+    delay = remaining
+    for granularity in granularities:
+        boundary = math.fmod(remaining, granularity)
+        if boundary < BOUNDARY_EPSILON:
+            boundary += granularity
+        delay = min(delay, boundary)
+    return delay
+
+
+def detectedOverrun(overrun, monotonicElapsed, wallElapsed):
+    """超过截止时间的秒数，按最早能发现超时的时刻计算
+
+    monotonicElapsed / wallElapsed 为上一次检查到这次检查两种时钟各走过的秒数。
+    期间发生过休眠时，唤醒后到这次检查之间的清醒时间只是检查间隔造成的发现延迟，
+    不算作超时；由于不知道休眠前清醒了多久，结果偏小，误差不超过一个检查间隔。
+    """
+    if wallElapsed - monotonicElapsed <= SUSPEND_THRESHOLD:
+        return overrun
+    return max(0.0, overrun - monotonicElapsed)
+
+
+class TBDeadlineTimer(QObject):
+    """基于单调时钟截止时间的单次定时调度器
+
+    只计算一次截止时间，每次唤醒后重新挂一个单次 QTimer，
+    要么对准下一个整秒边界（需要刷新显示时），要么直接对准截止时间。
+    同时记录墙上时间的截止时刻：休眠期间单调时钟不走，唤醒后以先到的一个为准。
+    触发时 overrun 为超过截止时间的秒数（见 detectedOverrun）。
+    """
+    tick = Signal()
+    fired = Signal()
+
+    def __init__(self, clock=None):
+        super().__init__()
+        self.clock = clock or TBSystemClock()
+        self.deadline = None
+        self.wallDeadline = None
+        self.overrun = 0.0
+        self.tickInterval = 1
+        self.wakeups = 0  # 本次会话的唤醒次数
+        self._expected = 0.0  # 下一次预定唤醒的单调时钟时刻
+        self._checked = (0.0, 0.0)  # 上一次检查截止时间时的 (单调时钟, 墙上时间)
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self._onTimeout)
+
+    def start(self, seconds):
+        """从现在起 seconds 秒后触发"""
+        self.deadline = self.clock.monotonic() + seconds
+        self.wallDeadline = self.clock.time() + seconds
+        self._checked = (self.deadline - seconds, self.wallDeadline - seconds)
+        self._arm()
+
+    def stop(self):
+        """取消调度"""
+        self.deadline = None
+        self.wallDeadline = None
+        self._timer.stop()
+
+    def isActive(self):
+        return self.deadline is not None
+
+    def remaining(self):
+        """距截止时间的剩余秒数，未启动时返回 None"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - self.clock.monotonic())
+
+    def setTickInterval(self, seconds):
+        """设置刷新粒度（秒，或多个粒度的元组），None 表示只在截止时间唤醒"""
+        if seconds == self.tickInterval:
+            return
+        self.tickInterval = seconds
+        if self.deadline is not None:
+            self._arm()
+
+    def _arm(self):
+        now = self.clock.monotonic()
+        # 显示边界按单调时钟计算；墙上时间的截止时刻和定期检查只会让唤醒提前
+        delay = min(nextWakeupDelay(self.deadline - now, self.tickInterval),
+                    max(0.0, self.wallDeadline - self.clock.time()), WALL_CHECK_INTERVAL)
+        # 向上取整到毫秒，保证不会在边界之前醒来
+        milliseconds = math.ceil(delay * 1000)
+        self._expected = now + milliseconds / 1000
+        self._timer.start(milliseconds)
+
+    def _onTimeout(self):
+        if self.deadline is None:
+            return
+        self.wakeups += 1
+        now = self.clock.monotonic()
+        if metrics.enabled:
+            metrics.tickJitter.observe(max(0.0, now - self._expected))
+        wall_now = self.clock.time()
+        checked_monotonic, checked_wall = self._checked
+        self._checked = (now, wall_now)
+        if now >= self.deadline or wall_now >= self.wallDeadline:
+            late = max(0.0, now - self.deadline, wall_now - self.wallDeadline)
+            if metrics.enabled:
+                metrics.fireDelay.observe(late)
+            self.overrun = detectedOverrun(late, now - checked_monotonic, wall_now - checked_wall)
+            self.deadline = None
+            self.wallDeadline = None
+            self.fired.emit()
+            return
+        self.tick.emit()
+        if self.deadline is not None:
+            self._arm()
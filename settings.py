@@ -0,0 +1,138 @@
+import math
+
+from PySide6.QtCore import QObject, QSettings, QTimer, Signal
+
+
+class TBSetting:
+    """设置项的类型、默认值和取值范围"""
+    __slots__ = ("type", "default", "minimum", "maximum")
+
+    def __init__(self, type, default, minimum=None, maximum=None):
+        self.type = type
+        self.default = default
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def coerce(self, value):
+        """转换为本项的类型并限制在范围内，无法转换或不是有限数时抛出 ValueError/TypeError/OverflowError"""
+        if self.type is bool and isinstance(value, str):
+            # 注册表和 ini 后端里布尔值可能以字符串保存
+            value = value.strip().lower() in ("true", "1", "yes")
+        value = self.type(value)
+        if isinstance(value, float) and not math.isfinite(value):
+            # NaN 与任何范围比较都为假，会绕过上下限
+            raise ValueError(f"无效的数值: {value}")
+        if self.minimum is not None and value < self.minimum:
+            value = self.minimum
+        if self.maximum is not None and value > self.maximum:
+            value = self.maximum
+        return value
+
+
+# 全部设置项，范围与界面上的控件一致
+SCHEMA = {
+    "stopAfterBreak": TBSetting(bool, False),
+    "showTimerInMenuBar": TBSetting(bool, True),
+    "showProgressIcon": TBSetting(bool, False),
+    "workIntervalLength": TBSetting(int, 25, 1, 60),
+    "shortRestIntervalLength": TBSetting(int, 5, 1, 60),
+    "longRestIntervalLength": TBSetting(int, 15, 1, 60),
+    "workIntervalsInSet": TBSetting(int, 4, 1, 10),
+    "overrunTimeLimit": TBSetting(float, -60.0),
+    "windupVolume": TBSetting(float, 1.0, 0.0, 2.0),
+    "dingVolume": TBSetting(float, 1.0, 0.0, 2.0),
+    "tickingVolume": TBSetting(float, 1.0, 0.0, 2.0),
+    "audioIdleTimeout": TBSetting(int, 60, 0),
+}
+
+
+class TBSettings(QObject):
+    """共享的设置存储
+
+    启动时从后端（默认 QSettings）一次性读出全部设置项，之后读取就是普通的属性访问，
+    例如 settings.workIntervalLength。setValue 校验后立即更新内存并发出 changed，
+    写回后端推迟到 flushDelay 毫秒内没有新的修改时批量进行，退出时再 flush 一次。
+    """
+    changed = Signal(str, object)
+
+    def __init__(self, backend=None, flushDelay=2000, schema=SCHEMA):
+        super().__init__()
+        self.schema = schema
+        self.flushDelay = flushDelay
+        self._backend = backend
+        self._dirty = set()
+        self._flushTimer = None
+        self._loaded = False
+        self.flushes = 0  # 本次会话写回后端的次数
+
+    def __getattr__(self, key):
+        # 只有实例上还没有这个属性时才会进来：第一次读取时加载全部设置
+        schema = self.__dict__.get("schema")
+        if schema is None or key not in schema or self.__dict__.get("_loaded"):
+            raise AttributeError(key)
+        self.load()
+        return self.__dict__[key]
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = QSettings("TomatoBar", "TomatoBar")
+        return self._backend
+
+    def load(self):
+        """从后端读出全部设置项，非法值退回默认值"""
+        for key, setting in self.schema.items():
+            try:
+                value = setting.coerce(self.backend.value(key, setting.default))
+            except (TypeError, ValueError, OverflowError) as e:
+                print(f"读取设置 {key} 失败，使用默认值: {e}")
+                value = setting.default
+            self.__dict__[key] = value
+        self._loaded = True
+
+    def value(self, key, default=None, type=None):
+        """兼容 QSettings 的读取接口"""
+        if key not in self.schema:
+            return default
+        return getattr(self, key)
+
+    def setValue(self, key, value):
+        """校验并修改设置，值有变化时通知并安排写回"""
+        setting = self.schema.get(key)
+        if setting is None:
+            raise KeyError(f"未知的设置项: {key}")
+        value = setting.coerce(value)
+        if getattr(self, key) == value:
+            return
+        self.__dict__[key] = value
+        self._dirty.add(key)
+        self.changed.emit(key, value)
+        self._scheduleFlush()
+
+    def _scheduleFlush(self):
+        if self._flushTimer is None:
+            self._flushTimer = QTimer(self)
+            self._flushTimer.setSingleShot(True)
+            self._flushTimer.timeout.connect(self.flush)
+        self._flushTimer.start(self.flushDelay)
+
+    def flush(self):
+        """把修改过的设置写回后端"""
+        if self._flushTimer:
+            self._flushTimer.stop()
+        if not self._dirty:
+            return
+        try:
+            for key in sorted(self._dirty):
+                self.backend.setValue(key, self.__dict__[key])
+            if hasattr(self.backend, "sync"):
+                self.backend.sync()
+        except Exception as e:
+            print(f"保存设置失败: {e}")
+            return
+        self._dirty.clear()
+        self.flushes += 1
+
+
+# 全局设置存储
+settings = TBSettings()
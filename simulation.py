@@ -0,0 +1,225 @@
+"""无界面的虚拟时钟模拟
+
+用虚拟时钟和替身依赖驱动 TBTimer / TBStateMachine，不创建 QSystemTrayIcon
+或 QMediaPlayer，直接跳到下一个截止时间，可以在一秒内跑完成千上万个番茄周期。
+"""
+from PySide6.QtCore import QObject, Signal
+
+from scheduler import detectedOverrun
+from state import TBStateMachineStates
+from settings import TBSettings
+from timer import TBTimer
+
+
+class TBVirtualClock:
+    """虚拟时钟，只在调用 advance 时前进"""
+    def __init__(self, start=0.0, wall_start=1_700_000_000.0):
+        self._monotonic = start
+        self._wallOffset = wall_start - start
+
+    def monotonic(self):
+        return self._monotonic
+
+    def time(self):
+        return self._monotonic + self._wallOffset
+
+    def advance(self, seconds):
+        self._monotonic += seconds
+
+    def suspend(self, seconds):
+        """模拟系统休眠：墙上时间前进，单调时钟不动"""
+        self._wallOffset += seconds
+
+
+class TBVirtualScheduler(QObject):
+    """与 TBDeadlineTimer 接口一致，但由模拟器推进而不是 QTimer"""
+    tick = Signal()
+    fired = Signal()
+
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+        self.deadline = None
+        self.wallDeadline = None
+        self.overrun = 0.0
+        self.tickInterval = 1
+        self.wakeups = 0
+        self._checked = (0.0, 0.0)
+
+    def start(self, seconds):
+        self.deadline = self.clock.monotonic() + seconds
+        self.wallDeadline = self.clock.time() + seconds
+        self._checked = (self.clock.monotonic(), self.clock.time())
+
+    def stop(self):
+        self.deadline = None
+        self.wallDeadline = None
+
+    def isActive(self):
+        return self.deadline is not None
+
+    def remaining(self):
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - self.clock.monotonic())
+
+    def setTickInterval(self, seconds):
+        self.tickInterval = seconds
+
+    def poll(self):
+        """时钟前进后调用：到期则触发 fired，否则补发一次 tick"""
+        if self.deadline is None:
+            return False
+        self.wakeups += 1
+        now, wall_now = self.clock.monotonic(), self.clock.time()
+        checked_monotonic, checked_wall = self._checked
+        self._checked = (now, wall_now)
+        if now >= self.deadline or wall_now >= self.wallDeadline:
+            late = max(0.0, now - self.deadline, wall_now - self.wallDeadline)
+            self.overrun = detectedOverrun(late, now - checked_monotonic, wall_now - checked_wall)
+            self.deadline = None
+            self.wallDeadline = None
+            self.fired.emit()
+            return True
+        if self.tickInterval:
+            self.tick.emit()
+        return False
+
+
+class TBMemorySettings:
+    """只存在内存中的设置后端，接口与 QSettings.value/setValue 一致"""
+    def __init__(self, values=None):
+        self.values = dict(values or {})
+
+    def value(self, key, default=None, type=None):
+        value = self.values.get(key, default)
+        return type(value) if type and value is not None else value
+
+    def setValue(self, key, value):
+        self.values[key] = value
+
+
+class TBNullPlayer:
+    """静音播放器，只记录调用次数"""
+    windupVolume = dingVolume = tickingVolume = 0.0
+
+    def __init__(self):
+        self.calls = {"windup": 0, "ding": 0, "ticking": 0}
+
+    def playWindup(self):
+        self.calls["windup"] += 1
+
+    def playDing(self):
+        self.calls["ding"] += 1
+
+    def startTicking(self):
+        self.calls["ticking"] += 1
+
+    def stopTicking(self):
+        pass
+
+
+class TBNullNotificationCenter:
+    """不显示任何通知，只记录发送过的类别和正文"""
+    def __init__(self):
+        self.handler = None
+        self.sent = []
+        self.bodies = []
+
+    def setActionHandler(self, handler):
+        self.handler = handler
+
+    def send(self, title, body, category=None):
+        self.sent.append(category)
+        self.bodies.append(body)
+
+    def trigger(self, action):
+        """模拟用户点击通知动作"""
+        if self.handler:
+            self.handler(action)
+
+
+class TBNullStatusItem:
+    """托盘图标替身，记录图标和提示文字"""
+    def __init__(self):
+        self.icon = "idle"
+        self.title = None
+        self.iconChanges = 0
+
+    def setIcon(self, name):
+        self.icon = name
+        self.iconChanges += 1
+
+    def setTitle(self, title):
+        self.title = title
+
+
+class TBSimulation:
+    """无界面模拟器
+
+    用法:
+        sim = TBSimulation(workIntervalsInSet=4, stopAfterBreak=False)
+        sim.startStop()
+        sim.runWorkIntervals(1000)
+    """
+    def __init__(self, **settings):
+        self.clock = TBVirtualClock()
+        self.settings = TBSettings(TBMemorySettings(settings))
+        self.player = TBNullPlayer()
+        self.notificationCenter = TBNullNotificationCenter()
+        self.statusItem = TBNullStatusItem()
+        self.scheduler = TBVirtualScheduler(self.clock)
+        self.timer = TBTimer(
+            settings=self.settings,
+            player=self.player,
+            notificationCenter=self.notificationCenter,
+            scheduler=self.scheduler,
+            clock=self.clock,
+            recordHistory=False,
+        )
+        self.timer.statusItem = self.statusItem
+
+        # 按 (from, to) 统计转换次数
+        self.transitions = {}
+        self.timer.stateMachine.addHandler(None, None, self._recordTransition)
+
+    def _recordTransition(self, from_state, to_state):
+        key = (from_state, to_state)
+        self.transitions[key] = self.transitions.get(key, 0) + 1
+
+    @property
+    def state(self):
+        return self.timer.stateMachine.currentState
+
+    def count(self, from_state, to_state):
+        return self.transitions.get((from_state, to_state), 0)
+
+    def startStop(self):
+        self.timer.startStop()
+
+    def skipRest(self):
+        self.timer.skipRest()
+
+    def advance(self, seconds):
+        """时钟前进 seconds 秒（不论是否跨过截止时间），然后处理到期事件"""
+        self.clock.advance(seconds)
+        return self.scheduler.poll()
+
+    def suspend(self, seconds):
+        """系统休眠 seconds 秒后唤醒；与真实调度器一样，要等下一次唤醒（advance）才会发现"""
+        self.clock.suspend(seconds)
+
+    def advanceToDeadline(self, overshoot=0.0):
+        """直接跳到当前截止时间，overshoot 用于模拟休眠后迟到的触发"""
+        remaining = self.scheduler.remaining()
+        if remaining is None:
+            return False
+        return self.advance(remaining + overshoot)
+
+    def runWorkIntervals(self, count):
+        """跑完 count 个完整的工作间隔，空闲时自动重新开始"""
+        target = self.count(TBStateMachineStates.WORK, TBStateMachineStates.REST) + count
+        while self.count(TBStateMachineStates.WORK, TBStateMachineStates.REST) < target:
+            if self.state == TBStateMachineStates.IDLE:
+                self.startStop()
+            self.advanceToDeadline()
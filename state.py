@@ -1,6 +1,11 @@
+import threading
+import time
+from collections import deque
 from enum import Enum, auto
 from typing import Dict, Callable, List, Optional, Tuple
 
+from metrics import metrics
+
 class TBStateMachineStates(Enum):
     """状态机的状态"""
     IDLE = auto()
@@ -29,6 +34,23 @@ class TBStateMachine:
         self.currentState = initial_state
         self.routes = {}  # Dictionary to store routes
         self.handlers = {}  # Dictionary to store handlers
+        self.transitionHandlers = []  # 接收完整上下文的处理器，在所有状态处理器之后调用
+        self.frozen = False
+        # freeze() 编译出的分发表，按枚举值直接索引
+        self._routeTable = None
+        self._transitionTable = ()
+
+        # 运行至完成：转换进行中投递的事件排队，当前转换结束后按顺序处理
+        self._queue = deque()
+        self._dispatching = False
+        self._ownerThread = threading.get_ident()
+        self._wakePending = False
+        # 队列中连续重复的这些事件在处理时合并为一个。START_STOP 是开关，
+        # 两次合并成一次会改变最终状态，因此默认只合并 TIMER_FIRED
+        self.coalescedEvents = frozenset((TBStateMachineEvents.TIMER_FIRED,))
+        self.coalesced = 0
+        # 其他线程投递事件后用来唤醒所属线程的回调，由使用者设置
+        self.wakeup = None
         
     def addRoute(self, 
                 event: TBStateMachineEvents, 
@@ -41,6 +63,8 @@ class TBStateMachine:
             self.routes[key] = []
         
         self.routes[key].append((to_state, condition))
+        if self.frozen:
+            self.freeze()
     
     def addHandler(self, 
                  from_state: Optional[TBStateMachineStates], 
@@ -51,9 +75,112 @@ class TBStateMachine:
         if key not in self.handlers:
             self.handlers[key] = []
         self.handlers[key].append(handler)
+        if self.frozen:
+            self.freeze()
     
+    def addTransitionHandler(self, handler: Callable[[TBStateMachineContext], None]):
+        """添加转换处理器，每次状态转换后以上下文调用（用于日志和历史记录）"""
+        self.transitionHandlers.append(handler)
+        if self.frozen:
+            self.freeze()
+
+    def freeze(self):
+        """把路由和处理器编译成按枚举值索引的密集表
+
+        每个 (事件, 源状态) 对应一组 (目标状态, 条件, 上下文, 处理器) 元组：
+        处理器已按 精确 -> (None, to) -> (from, None) -> (None, None) 的顺序展开，
+        第一个无条件路由之后的路由永远不会命中，编译时直接截掉；
+        上下文对象也预先创建，分发路径上不再分配任何对象。
+        冻结后再注册路由或处理器会自动重新编译。
+        """
+        states = list(type(self.currentState))
+        events = list(TBStateMachineEvents)
+        state_slots = max(state._value_ for state in states) + 1
+        event_slots = max(event._value_ for event in events) + 1
+
+        table = [[()] * state_slots for _ in range(event_slots)]
+        for (event, from_state), routes in self.routes.items():
+            compiled = []
+            for to_state, condition in routes:
+                handlers = []
+                for key in ((from_state, to_state), (None, to_state), (from_state, None), (None, None)):
+                    handlers.extend(self.handlers.get(key, ()))
+                if metrics.enabled:
+                    # 启用指标时才包上计时，关闭时分发路径没有任何额外开销
+                    handlers = [metrics.timedHandler(handler) for handler in handlers]
+                context = TBStateMachineContext(event, from_state, to_state)
+                compiled.append((to_state, condition, context, tuple(handlers)))
+                if condition is None:
+                    break
+            table[event._value_][from_state._value_] = tuple(compiled)
+
+        self._routeTable = tuple(tuple(row) for row in table)
+        transition_handlers = self.transitionHandlers
+        if metrics.enabled:
+            transition_handlers = [metrics.timedHandler(handler) for handler in transition_handlers]
+        self._transitionTable = tuple(transition_handlers)
+        self.frozen = True
+
     def handleEvent(self, event: TBStateMachineEvents):
-        """处理事件，执行状态转换"""
+        """处理事件，执行状态转换（只能在所属线程调用）
+
+        如果正处于另一个转换的处理器中，事件进入队列并返回 None，
+        等当前转换完成后再依次处理。
+        """
+        if self._dispatching:
+            self._queue.append(event)
+            return None
+        self._dispatching = True
+        try:
+            result = self._dispatch(event)
+            self._drain()
+        finally:
+            self._dispatching = False
+        return result
+
+    def postEvent(self, event: TBStateMachineEvents):
+        """从任意线程投递事件
+
+        其他线程只做一次无锁的 deque.append，再通过 wakeup 回调通知所属线程
+        调用 processEvents；在所属线程上等同于 handleEvent。
+        合并重复事件只在所属线程取出事件时进行，投递方不读取队列。
+        """
+        if threading.get_ident() == self._ownerThread:
+            return self.handleEvent(event)
+        self._queue.append(event)
+        # 先入队再检查标志，配合 processEvents 先清标志再处理，不会丢失唤醒
+        if not self._wakePending and self.wakeup:
+            self._wakePending = True
+            self.wakeup()
+        return None
+
+    def processEvents(self):
+        """在所属线程处理其他线程投递的事件"""
+        self._wakePending = False
+        if self._dispatching:
+            return
+        self._dispatching = True
+        try:
+            self._drain()
+        finally:
+            self._dispatching = False
+
+    def _drain(self):
+        """在所属线程依次处理队列；只有这里会从队列左端取出事件"""
+        queue = self._queue
+        coalesced = self.coalescedEvents
+        while queue:
+            event = queue.popleft()
+            if event in coalesced:
+                while queue and queue[0] is event:
+                    queue.popleft()
+                    self.coalesced += 1
+            self._dispatch(event)
+
+    def _dispatch(self, event: TBStateMachineEvents):
+        if self.frozen:
+            return self._dispatchFrozen(event)
+
         key = (event, self.currentState)
 
         # print(f"状态机处理事件: {event}，当前状态: {self.currentState}")
@@ -78,6 +205,13 @@ class TBStateMachine:
                 
                 # 调用处理器
                 self._callHandlers(old_state, to_state)
+
+                # 处理器执行完毕后再记录，此时新间隔的长度已经确定
+                for handler in self.transitionHandlers:
+                    try:
+                        handler(context)
+                    except Exception as e:
+                        print(f"处理器调用错误: {e}")
                 
                 return True
         
@@ -111,3 +245,25 @@ class TBStateMachine:
                     handler(actual_from_state, actual_to_state)
                 except Exception as e:
                     print(f"处理器调用错误: {e}")
+
+    def _dispatchFrozen(self, event: TBStateMachineEvents):
+        """冻结后的分发路径：两次下标访问取到路由，处理器列表已展开"""
+        if metrics.enabled:
+            # 从查路由之前开始计时，处理器延迟包含路由查找和条件判断
+            metrics.transitionStart = time.perf_counter()
+        for to_state, condition, context, handlers in self._routeTable[event._value_][self.currentState._value_]:
+            if condition is None or condition():
+                from_state = self.currentState
+                self.currentState = to_state
+                for handler in handlers:
+                    try:
+                        handler(from_state, to_state)
+                    except Exception as e:
+                        print(f"处理器调用错误: {e}")
+                for handler in self._transitionTable:
+                    try:
+                        handler(context)
+                    except Exception as e:
+                        print(f"处理器调用错误: {e}")
+                return True
+        return False
@@ -0,0 +1,175 @@
+import json
+import os
+from datetime import date, datetime, timedelta
+
+# 每次读取的块大小，首次扫描大日志时内存占用保持平稳
+CHUNK_SIZE = 1 << 20
+# 用文件开头若干字节识别日志是否被替换
+HEAD_SIZE = 64
+CHECKPOINT_VERSION = 1
+
+_WORK = "TBStateMachineStates.WORK"
+_REST = "TBStateMachineStates.REST"
+_IDLE = "TBStateMachineStates.IDLE"
+_TIMER_FIRED = "TBStateMachineEvents.TIMER_FIRED"
+_START_STOP = "TBStateMachineEvents.START_STOP"
+
+
+def _emptyDay():
+    return {"completedWork": 0, "interruptedWork": 0, "restSeconds": 0.0}
+
+
+class TBStatistics:
+    """TomatoBar.log 的增量统计
+
+    维护按天的累计值（完成的工作间隔、中断的工作间隔、实际休息秒数），
+    并把最后处理到的字节偏移量和累计值一起保存为检查点。
+    重启后只需处理检查点之后新追加的部分。
+    """
+    def __init__(self, log_path=None, checkpoint_path=None):
+        if log_path is None:
+            from log import logger
+            log_path = logger.log_path
+        self.log_path = log_path
+        self.checkpoint_path = checkpoint_path or os.path.join(
+            os.path.dirname(log_path), "TomatoBar.stats.json")
+        self._reset()
+        self._loadCheckpoint()
+
+    def _reset(self):
+        self.offset = 0
+        self.head = ""
+        self.days = {}
+        self.restStartedAt = None  # 当前休息开始的时间戳，跨重启保留
+
+    def _loadCheckpoint(self):
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != CHECKPOINT_VERSION:
+                return
+            self.offset = data["offset"]
+            self.head = data["head"]
+            self.days = data["days"]
+            self.restStartedAt = data.get("restStartedAt")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"统计检查点损坏，重新扫描: {e}")
+            self._reset()
+
+    def save(self):
+        """原子地写入检查点"""
+        data = {
+            "version": CHECKPOINT_VERSION,
+            "offset": self.offset,
+            "head": self.head,
+            "days": self.days,
+            "restStartedAt": self.restStartedAt,
+        }
+        tmp_path = self.checkpoint_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.checkpoint_path)
+        except Exception as e:
+            print(f"保存统计检查点失败: {e}")
+
+    def update(self, save=True):
+        """处理日志中新追加的部分，返回处理的事件数"""
+        try:
+            f = open(self.log_path, "rb")
+        except FileNotFoundError:
+            return 0
+
+        processed = 0
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            head = f.read(HEAD_SIZE)
+            stored = bytes.fromhex(self.head)
+            # 日志被截断或替换时从头开始
+            if size < self.offset or head[:len(stored)] != stored:
+                self._reset()
+            self.head = head.hex()
+
+            f.seek(self.offset)
+            pending = b""
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                chunk = pending + chunk
+                end = chunk.rfind(b"\n")
+                if end < 0:
+                    pending = chunk
+                    continue
+                pending = chunk[end + 1:]
+                for line in chunk[:end].split(b"\n"):
+                    processed += self._processLine(line)
+                self.offset += end + 1
+            # 末尾不完整的一行（写入线程还没写完）留到下次
+
+        if processed and save:
+            self.save()
+        return processed
+
+    def _processLine(self, line):
+        # 先做廉价的字节过滤，只解析转换事件
+        if b'"transition"' not in line and b'"appstart"' not in line:
+            return 0
+        try:
+            event = json.loads(line)
+        except ValueError:
+            return 0
+
+        timestamp = event.get("timestamp", 0)
+        if event.get("type") == "appstart":
+            # 上次运行在休息中退出，这段休息无法计入
+            self.restStartedAt = None
+            return 1
+
+        from_state = event.get("fromState")
+        to_state = event.get("toState")
+        day = self._day(timestamp)
+
+        if from_state == _WORK:
+            if to_state == _REST and event.get("event") == _TIMER_FIRED:
+                day["completedWork"] += 1
+            elif to_state == _IDLE and event.get("event") == _START_STOP:
+                day["interruptedWork"] += 1
+
+        if from_state == _REST and self.restStartedAt is not None:
+            rest_day = self._day(self.restStartedAt)
+            rest_day["restSeconds"] += max(0.0, timestamp - self.restStartedAt)
+            self.restStartedAt = None
+        if to_state == _REST:
+            self.restStartedAt = timestamp
+        return 1
+
+    def _day(self, timestamp):
+        key = datetime.fromtimestamp(timestamp).date().isoformat()
+        day = self.days.get(key)
+        if day is None:
+            day = self.days[key] = _emptyDay()
+        return day
+
+    def day(self, when=None):
+        """某一天的统计，默认今天"""
+        key = (when or date.today()).isoformat()
+        return dict(self.days.get(key) or _emptyDay())
+
+    def range(self, first, last):
+        """[first, last] 闭区间内各天统计之和"""
+        total = _emptyDay()
+        current = first
+        while current <= last:
+            for name, value in (self.days.get(current.isoformat()) or {}).items():
+                total[name] += value
+            current += timedelta(days=1)
+        return total
+
+    def week(self, when=None):
+        """所在自然周（周一开始）的统计"""
+        when = when or date.today()
+        first = when - timedelta(days=when.weekday())
+        return self.range(first, first + timedelta(days=6))
@@ -0,0 +1,94 @@
+import math
+import mmap
+import os
+import time
+
+from statusreader import (MAGIC, SEQUENCE, SEQUENCE_OFFSET, BODY, BODY_OFFSET, PAGE_SIZE,
+                          defaultStatusPath)
+
+# 状态页中的状态编号，0 表示 TomatoBar 没有运行
+STATE_CODES = {"idle": 1, "work": 2, "rest": 3}
+INTERVAL_CODES = {"work": 1, "shortrest": 2, "longrest": 3}
+
+
+class TBStatusPageWriter:
+    """状态页写入器
+
+    状态页是一个 64 字节的内存映射文件，布局见 statusreader.py。
+    每次写入先把序列号加一（变为奇数），写完数据再加一（变回偶数），
+    读取方发现序列号为奇数或前后不一致时重读（seqlock），不需要任何锁。
+    只在状态变化时写入，剩余时间由读取方根据截止时刻自行计算。
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self._map = None
+        self.sequence = 0
+        self.writes = 0
+
+    def _open(self):
+        path = self.path or defaultStatusPath()
+        self.path = path
+        try:
+            # 不删除也不替换已有文件，长期打开的读取方映射的始终是同一个文件。
+            # 没有 XDG_RUNTIME_DIR 时路径在公共的临时目录下且可以预测：
+            # 不跟随符号链接，只接受自己的文件，新建的文件只有自己可以读写
+            fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, "O_NOFOLLOW", 0), 0o600)
+            try:
+                info = os.fstat(fd)
+                if hasattr(os, "getuid") and info.st_uid != os.getuid():
+                    raise OSError(f"状态页不属于当前用户: {path}")
+                if hasattr(os, "fchmod"):
+                    # 旧版本创建的文件是 0644
+                    os.fchmod(fd, 0o600)
+                if info.st_size != PAGE_SIZE:
+                    os.ftruncate(fd, PAGE_SIZE)
+                self._map = mmap.mmap(fd, PAGE_SIZE)
+            finally:
+                os.close(fd)
+        except (OSError, ValueError) as e:
+            print(f"打开状态页失败: {e}")
+            self._map = None
+            return None
+
+        if self._map[:len(MAGIC)] == MAGIC:
+            # 接着上一个进程的序列号继续，保证读取方能看到变化；奇数说明上次写到一半
+            self.sequence = SEQUENCE.unpack_from(self._map, SEQUENCE_OFFSET)[0] & ~1
+        else:
+            # 新文件全为零（状态为未运行），最后写入魔数使其生效
+            self._map[:len(MAGIC)] = MAGIC
+        return self._map
+
+    def publish(self, state, interval="", consecutiveWorkIntervals=0, deadlineMonotonic=None,
+                deadlineWall=None, intervalLength=0.0):
+        """写入一份新状态"""
+        page = self._map or self._open()
+        if page is None:
+            return
+        body = (
+            STATE_CODES.get(state, 0),
+            INTERVAL_CODES.get(interval, 0),
+            consecutiveWorkIntervals,
+            os.getpid(),
+            math.nan if deadlineMonotonic is None else deadlineMonotonic,
+            math.nan if deadlineWall is None else deadlineWall,
+            float(intervalLength),
+            time.time(),
+        )
+        sequence = self.sequence
+        SEQUENCE.pack_into(page, SEQUENCE_OFFSET, (sequence + 1) & 0xFFFFFFFF)
+        BODY.pack_into(page, BODY_OFFSET, *body)
+        self.sequence = (sequence + 2) & 0xFFFFFFFF
+        SEQUENCE.pack_into(page, SEQUENCE_OFFSET, self.sequence)
+        self.writes += 1
+
+    def close(self):
+        """标记为未运行并关闭映射"""
+        if self._map is None:
+            return
+        self.publish("stopped")
+        self._map.close()
+        self._map = None
+
+
+# 全局状态页
+statusPage = TBStatusPageWriter()
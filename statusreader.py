@@ -0,0 +1,167 @@
+"""TomatoBar 状态页读取器
+
+TomatoBar 把当前状态写进一个定长的内存映射文件，外部状态栏（waybar、polybar、tmux 等）
+直接读取映射，不需要启动进程或连接套接字。本模块只依赖标准库，可以单独拷走使用。
+
+用法: python statusreader.py [--format "{state} {timeLeft}"] [--path 文件]
+
+布局（小端，共 64 字节）：
+  0  8s  magic       b"TBSTAT\\x00\\x01"
+  8  I   sequence    seqlock 计数，写入期间为奇数
+  12 B   state       0 未运行，1 空闲，2 工作，3 休息
+  13 B   interval    0 无，1 工作，2 短休息，3 长休息
+  16 I   consecutiveWorkIntervals
+  20 I   pid         写入进程
+  24 d   deadlineMonotonic  time.monotonic() 时间轴上的截止时刻，空闲时为 NaN
+  32 d   deadlineWall       time.time() 时间轴上的截止时刻，空闲时为 NaN
+  40 d   intervalLength     本次间隔的总秒数
+  48 d   updated            写入时的 time.time()
+剩余时间由读取方用截止时刻自己计算，写入方只在状态变化时更新。
+"""
+import math
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+
+MAGIC = b"TBSTAT\x00\x01"
+SEQUENCE = struct.Struct("<I")
+SEQUENCE_OFFSET = 8
+BODY = struct.Struct("<BBxxIIdddd")
+BODY_OFFSET = 12
+PAGE_SIZE = 64
+# 写入方在写到一半时退出会留下奇数计数，重读超过这个次数就放弃
+MAX_RETRIES = 10000
+
+STATES = ("stopped", "idle", "work", "rest")
+INTERVALS = ("", "work", "shortrest", "longrest")
+
+
+def defaultStatusPath():
+    """每个用户一个状态页，优先放在内存文件系统上"""
+    directory = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    try:
+        import getpass
+        user = getpass.getuser()
+    except Exception:
+        user = "user"
+    return os.path.join(directory, f"TomatoBar-{user}.status")
+
+
+class TBStatus:
+    """状态页的一份一致快照"""
+    __slots__ = ("state", "interval", "consecutiveWorkIntervals", "pid",
+                 "deadlineMonotonic", "deadlineWall", "intervalLength", "updated")
+
+    def __init__(self, state, interval, consecutive, pid, deadline_monotonic, deadline_wall,
+                 interval_length, updated):
+        self.state = STATES[state] if state < len(STATES) else "stopped"
+        self.interval = INTERVALS[interval] if interval < len(INTERVALS) else ""
+        self.consecutiveWorkIntervals = consecutive
+        self.pid = pid
+        self.deadlineMonotonic = deadline_monotonic
+        self.deadlineWall = deadline_wall
+        self.intervalLength = interval_length
+        self.updated = updated
+
+    @property
+    def running(self):
+        return not math.isnan(self.deadlineMonotonic)
+
+    def remaining(self, now=None, wallNow=None):
+        """剩余秒数，计时器没有运行时为 None
+
+        休眠期间单调时钟不走，与 TomatoBar 一样取两个截止时刻中先到的一个。
+        """
+        if not self.running:
+            return None
+        now = time.monotonic() if now is None else now
+        wallNow = time.time() if wallNow is None else wallNow
+        remaining = self.deadlineMonotonic - now
+        if not math.isnan(self.deadlineWall):
+            remaining = min(remaining, self.deadlineWall - wallNow)
+        return max(0.0, remaining)
+
+    def timeLeft(self, now=None, wallNow=None):
+        """剩余时间的 "MM:SS"，与托盘弹出窗口的显示一致（向上取整）"""
+        remaining = self.remaining(now, wallNow)
+        if remaining is None:
+            return ""
+        seconds = math.ceil(remaining)
+        return f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+    def progress(self, now=None, wallNow=None):
+        """已经过去的比例 0..1"""
+        remaining = self.remaining(now, wallNow)
+        if remaining is None or self.intervalLength <= 0:
+            return 0.0
+        return 1.0 - remaining / self.intervalLength
+
+
+class TBStatusReader:
+    """长期打开的状态页读取器，适合每秒读取多次的场合"""
+    def __init__(self, path=None):
+        self.path = path or defaultStatusPath()
+        self._map = None
+        self.retries = 0  # 因为读到写入中的数据而重读的次数
+
+    def _open(self):
+        try:
+            with open(self.path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), PAGE_SIZE, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            self._map = None
+        return self._map
+
+    def read(self):
+        """读取一份一致的快照；状态页不存在或无效时返回 None"""
+        page = self._map or self._open()
+        if page is None or page[:len(MAGIC)] != MAGIC:
+            return None
+        for _ in range(MAX_RETRIES):
+            before = SEQUENCE.unpack_from(page, SEQUENCE_OFFSET)[0]
+            if not before & 1:
+                body = BODY.unpack_from(page, BODY_OFFSET)
+                if SEQUENCE.unpack_from(page, SEQUENCE_OFFSET)[0] == before:
+                    return TBStatus(*body)
+            self.retries += 1
+        return None
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+def read(path=None):
+    """读取一次状态"""
+    reader = TBStatusReader(path)
+    try:
+        return reader.read()
+    finally:
+        reader.close()
+
+
+def main(argv):
+    fmt = "{state} {timeLeft}"
+    path = None
+    args = list(argv[1:])
+    while args:
+        arg = args.pop(0)
+        if arg == "--format" and args:
+            fmt = args.pop(0)
+        elif arg == "--path" and args:
+            path = args.pop(0)
+    status = read(path)
+    if status is None or status.state == "stopped":
+        return 1
+    print(fmt.format(state=status.state, interval=status.interval, timeLeft=status.timeLeft(),
+                     consecutiveWorkIntervals=status.consecutiveWorkIntervals,
+                     progress=status.progress()).strip())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
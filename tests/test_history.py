@@ -0,0 +1,76 @@
+"""二进制历史记录的格式、被截断文件的修复和读取器的关闭"""
+import os
+
+from history import HEADER, MAGIC, RECORD, TBHistoryReader, TBHistoryWriter
+from state import TBStateMachineContext, TBStateMachineEvents as E, TBStateMachineStates as S
+
+START = TBStateMachineContext(E.START_STOP, S.IDLE, S.WORK)
+FINISH = TBStateMachineContext(E.TIMER_FIRED, S.WORK, S.REST)
+
+
+def writeRecords(path, count=3):
+    writer = TBHistoryWriter(str(path))
+    for index in range(count):
+        writer.append(START if index % 2 == 0 else FINISH, 1500, 1000.0 + index)
+    writer.close()
+
+
+def test_record_layout(tmp_path):
+    path = tmp_path / "TomatoBar.history"
+    writeRecords(path, 2)
+
+    data = path.read_bytes()
+    assert RECORD.size == 16
+    assert data[:len(MAGIC)] == MAGIC
+    assert len(data) == len(HEADER) + 2 * RECORD.size
+    assert RECORD.unpack_from(data, len(HEADER)) == (1_000_000, E.START_STOP.value, S.IDLE.value,
+                                                     S.WORK.value, 1500)
+
+
+def test_reader_reads_and_summarizes(tmp_path):
+    path = tmp_path / "TomatoBar.history"
+    writeRecords(path, 4)
+
+    with TBHistoryReader(str(path)) as reader:
+        assert len(reader) == 4
+        assert reader.record(1)[1:4] == (E.TIMER_FIRED.value, S.WORK.value, S.REST.value)
+        assert reader.bisect(1002.0) == 2
+        summary = reader.summarize()
+    assert summary["transitions"] == 4
+    assert summary["completedWork"] == 2
+    assert summary["plannedWorkSeconds"] == 3000
+
+
+def test_partial_trailing_record_is_dropped(tmp_path):
+    path = tmp_path / "TomatoBar.history"
+    writeRecords(path, 2)
+    with open(path, "ab") as f:
+        f.write(b"\x01\x02\x03")
+
+    writeRecords(path, 1)
+    assert os.path.getsize(path) == len(HEADER) + 3 * RECORD.size
+    with TBHistoryReader(str(path)) as reader:
+        assert len(reader) == 3
+
+
+def test_truncated_header_is_rewritten(tmp_path):
+    path = tmp_path / "TomatoBar.history"
+    path.write_bytes(MAGIC[:5])
+
+    writeRecords(path, 1)
+    assert path.read_bytes()[:len(HEADER)] == HEADER
+    with TBHistoryReader(str(path)) as reader:
+        assert len(reader) == 1
+
+
+def test_close_with_live_slice(tmp_path):
+    path = tmp_path / "TomatoBar.history"
+    writeRecords(path, 2)
+
+    reader = TBHistoryReader(str(path))
+    view = reader.slice()
+    reader.close()
+    assert reader._file.closed
+    # 视图仍然可用，释放后映射被回收
+    assert len(view) == 2 * RECORD.size
+    view.release()
@@ -0,0 +1,118 @@
+"""用 TBSimulation 回归测试 stopAfterBreak、workIntervalsInSet 和 overrunTimeLimit"""
+import pytest
+
+pytest.importorskip("PySide6")
+
+from notifications import TBNotification
+from scheduler import WALL_CHECK_INTERVAL
+from simulation import TBSimulation
+from state import TBStateMachineEvents, TBStateMachineStates
+
+IDLE = TBStateMachineStates.IDLE
+WORK = TBStateMachineStates.WORK
+REST = TBStateMachineStates.REST
+
+LONG_BREAK = "It's time for a long break!"
+SHORT_BREAK = "It's time for a short break!"
+
+
+def test_stop_after_break_ends_in_idle():
+    sim = TBSimulation(stopAfterBreak=True)
+    sim.startStop()
+    assert sim.state == WORK
+
+    sim.advanceToDeadline()
+    assert sim.state == REST
+    sim.advanceToDeadline()
+
+    assert sim.state == IDLE
+    assert sim.count(REST, IDLE) == 1
+    assert sim.count(REST, WORK) == 0
+    assert not sim.timer.isRunning()
+
+
+def test_break_continues_into_work_by_default():
+    sim = TBSimulation(stopAfterBreak=False)
+    sim.startStop()
+    sim.advanceToDeadline()
+    sim.advanceToDeadline()
+
+    assert sim.state == WORK
+    assert sim.notificationCenter.sent == [TBNotification.Category.REST_STARTED,
+                                           TBNotification.Category.REST_FINISHED]
+
+
+@pytest.mark.parametrize("intervals", [1, 2, 4])
+def test_long_rest_after_work_intervals_in_set(intervals):
+    sim = TBSimulation(workIntervalsInSet=intervals)
+    sim.startStop()
+
+    for completed in range(1, intervals):
+        sim.advanceToDeadline()
+        assert sim.state == REST
+        assert sim.timer.consecutiveWorkIntervals == completed
+        assert sim.notificationCenter.bodies[-1] == SHORT_BREAK
+        assert sim.statusItem.icon == "shortrest"
+        sim.advanceToDeadline()
+        assert sim.state == WORK
+
+    sim.advanceToDeadline()
+    assert sim.state == REST
+    assert sim.notificationCenter.bodies[-1] == LONG_BREAK
+    assert sim.statusItem.icon == "longrest"
+    # 长休息开始时计数清零，下一组重新计数
+    assert sim.timer.consecutiveWorkIntervals == 0
+    assert sim.scheduler.remaining() == pytest.approx(sim.timer.longRestIntervalLength * 60)
+
+    rest_started = [category for category in sim.notificationCenter.sent
+                    if category == TBNotification.Category.REST_STARTED]
+    assert len(rest_started) == intervals
+
+
+def test_overrun_beyond_limit_goes_idle_through_start_stop():
+    sim = TBSimulation(overrunTimeLimit=-60.0)
+    events = []
+    sim.timer.stateMachine.addTransitionHandler(lambda context: events.append(context.event))
+    sim.startStop()
+
+    sim.advanceToDeadline(overshoot=61)
+
+    assert sim.state == IDLE
+    assert sim.count(WORK, IDLE) == 1
+    assert sim.count(WORK, REST) == 0
+    assert events[-1] == TBStateMachineEvents.START_STOP
+
+
+def test_overrun_within_limit_still_fires():
+    sim = TBSimulation(overrunTimeLimit=-60.0)
+    sim.startStop()
+
+    sim.advanceToDeadline(overshoot=59)
+
+    assert sim.state == REST
+
+
+def test_suspend_past_deadline_goes_idle_on_resume():
+    sim = TBSimulation()
+    sim.startStop()
+    sim.advance(15 * 60)
+
+    # 单调时钟在休眠期间不走，唤醒后的第一次检查按墙上时间判断已经超时
+    sim.suspend(2 * 60 * 60)
+    sim.advance(WALL_CHECK_INTERVAL)
+
+    assert sim.state == IDLE
+    assert sim.count(WORK, REST) == 0
+
+
+def test_resume_just_past_deadline_is_not_an_overrun():
+    sim = TBSimulation(overrunTimeLimit=-60.0)
+    sim.startStop()
+    sim.advance(15 * 60)
+
+    # 剩 10 分钟时休眠，唤醒时只超过截止时间 10 秒；第一次检查在一个检查间隔之后
+    sim.suspend(10 * 60 + 10)
+    sim.advance(WALL_CHECK_INTERVAL)
+
+    assert sim.state == REST
+    assert sim.scheduler.overrun == pytest.approx(10)
@@ -0,0 +1,108 @@
+"""TBStatistics 的增量扫描：检查点续读、末尾不完整的行、日志截断或替换后重来"""
+import json
+from datetime import datetime
+
+from stats import TBStatistics
+
+DAY = "2024-03-04"
+# 当天中午（本地时间），避免时区让记录落到别的日期
+NOON = datetime(2024, 3, 4, 12).timestamp()
+NEXT_DAY = "2024-03-05"
+
+
+def transition(timestamp, event, from_state, to_state):
+    return json.dumps({
+        "type": "transition",
+        "timestamp": timestamp,
+        "event": f"TBStateMachineEvents.{event}",
+        "fromState": f"TBStateMachineStates.{from_state}",
+        "toState": f"TBStateMachineStates.{to_state}",
+    }, sort_keys=True) + "\n"
+
+
+def completedWork(timestamp):
+    """一次完成的工作间隔和 300 秒休息"""
+    return (transition(timestamp, "START_STOP", "IDLE", "WORK")
+            + transition(timestamp + 1500, "TIMER_FIRED", "WORK", "REST")
+            + transition(timestamp + 1800, "TIMER_FIRED", "REST", "IDLE"))
+
+
+def makeStats(tmp_path):
+    return TBStatistics(str(tmp_path / "TomatoBar.log"), str(tmp_path / "TomatoBar.stats.json"))
+
+
+def test_counts_completed_and_interrupted_work(tmp_path):
+    log = tmp_path / "TomatoBar.log"
+    log.write_text(completedWork(NOON) + transition(NOON + 2000, "START_STOP", "IDLE", "WORK")
+                   + transition(NOON + 2100, "START_STOP", "WORK", "IDLE"))
+
+    stats = makeStats(tmp_path)
+    stats.update()
+
+    day = stats.days[DAY]
+    assert day["completedWork"] == 1
+    assert day["interruptedWork"] == 1
+    assert day["restSeconds"] == 300
+
+
+def test_resumes_from_checkpoint(tmp_path):
+    log = tmp_path / "TomatoBar.log"
+    log.write_text(completedWork(NOON))
+    stats = makeStats(tmp_path)
+    assert stats.update() == 3
+
+    with open(log, "a") as f:
+        f.write(completedWork(NOON + 3600))
+
+    # 新实例从检查点继续，只处理新追加的三行
+    resumed = makeStats(tmp_path)
+    assert resumed.offset == log.stat().st_size - len(completedWork(NOON + 3600))
+    assert resumed.update() == 3
+    assert resumed.days[DAY]["completedWork"] == 2
+    assert resumed.offset == log.stat().st_size
+
+
+def test_partial_trailing_line_is_left_for_next_update(tmp_path):
+    log = tmp_path / "TomatoBar.log"
+    line = transition(NOON + 1500, "TIMER_FIRED", "WORK", "REST")
+    log.write_text(transition(NOON, "START_STOP", "IDLE", "WORK") + line[:20])
+
+    stats = makeStats(tmp_path)
+    assert stats.update() == 1
+    offset = stats.offset
+
+    with open(log, "a") as f:
+        f.write(line[20:])
+    assert stats.update() == 1
+    assert stats.offset == offset + len(line)
+    assert stats.days[DAY]["completedWork"] == 1
+
+
+def test_truncated_log_is_rescanned(tmp_path):
+    log = tmp_path / "TomatoBar.log"
+    log.write_text(completedWork(NOON) + completedWork(NOON + 3600))
+    stats = makeStats(tmp_path)
+    stats.update()
+    assert stats.days[DAY]["completedWork"] == 2
+
+    # 日志变短：之前的累计值作废
+    log.write_text(completedWork(NOON + 86400))
+    stats.update()
+    assert DAY not in stats.days
+    assert stats.days[NEXT_DAY]["completedWork"] == 1
+    assert stats.offset == log.stat().st_size
+
+
+def test_replaced_log_is_rescanned(tmp_path):
+    log = tmp_path / "TomatoBar.log"
+    log.write_text(completedWork(NOON))
+    stats = makeStats(tmp_path)
+    stats.update()
+
+    # 更长的新日志，但开头不一致：检查点作废
+    log.write_text(json.dumps({"timestamp": NOON + 86000, "type": "appstart"}) + "\n"
+                   + completedWork(NOON + 86400) + completedWork(NOON + 90000))
+    stats.update()
+    assert DAY not in stats.days
+    assert stats.days[NEXT_DAY]["completedWork"] == 2
+    assert stats.offset == log.stat().st_size
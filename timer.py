@@ -1,54 +1,103 @@
-import time
-from datetime import datetime, timedelta
-import os
-import json
-from PySide6.QtCore import QObject, Signal, Slot, QSettings, QTimer
-from PySide6.QtWidgets import QMessageBox
+import math
+
+from PySide6.QtCore import QObject, Qt, Signal, Slot
 
 from state import TBStateMachine, TBStateMachineStates, TBStateMachineEvents
-from player import TBPlayer
 from notifications import TBNotificationCenter, TBNotification
+from scheduler import TBDeadlineTimer, TBSystemClock
+from publisher import TBTimeLeftPublisher, MINUTES_TABLE, SECONDS_TABLE
+from log import logger, TBLogEventTransition
+from history import history
+from statuspage import statusPage
+from profiler import trace
+from settings import settings as sharedSettings
+
+# 计时器直接以属性保存的设置项，共享设置变化时同步过来
+TIMER_SETTINGS = (
+    "stopAfterBreak", "showTimerInMenuBar", "workIntervalLength", "shortRestIntervalLength",
+    "longRestIntervalLength", "workIntervalsInSet", "overrunTimeLimit",
+)
 
 class TBTimer(QObject):
     timeLeftStringChanged = Signal(str)
     stateChanged = Signal(str)
+    eventPosted = Signal()
 
-    def __init__(self):
+    def __init__(self, settings=None, player=None, notificationCenter=None, scheduler=None, clock=None,
+                 recordHistory=True):
+        """各依赖均可注入，不传时使用真实实现；无界面模拟见 simulation.py"""
         super().__init__()
-        self.settings = QSettings("TomatoBar", "TomatoBar")
+        self.clock = clock or TBSystemClock()
+        self.settings = settings if settings is not None else sharedSettings
 
         # 配置项
-        self.stopAfterBreak = self.settings.value("stopAfterBreak", False, bool)
-        self.showTimerInMenuBar = self.settings.value("showTimerInMenuBar", True, bool)
-        self.workIntervalLength = self.settings.value("workIntervalLength", 25, int)
-        self.shortRestIntervalLength = self.settings.value("shortRestIntervalLength", 5, int)
-        self.longRestIntervalLength = self.settings.value("longRestIntervalLength", 15, int)
-        self.workIntervalsInSet = self.settings.value("workIntervalsInSet", 4, int)
-        self.overrunTimeLimit = self.settings.value("overrunTimeLimit", -60.0, float)
+        for key in TIMER_SETTINGS:
+            setattr(self, key, getattr(self.settings, key))
+        self.showProgressIcon = self.settings.showProgressIcon
 
         # 初始化状态机
         self.stateMachine = TBStateMachine(TBStateMachineStates.IDLE)
         self.setupStateMachine()
 
         # 初始化音频播放器
-        self.player = TBPlayer()
+        if player is None:
+            with trace.phase("TBPlayer"):
+                from player import TBPlayer
+                player = TBPlayer(self.settings)
+        self.player = player
 
         # 初始化变量
         self.consecutiveWorkIntervals = 0
-        self.notificationCenter = TBNotificationCenter()
+        self.notificationCenter = notificationCenter or TBNotificationCenter()
         self.finishTime = None
-        self.timer = None  # 定时器
+        self.intervalLength = 0  # 当前间隔的总秒数，空闲时为 0
+        self.intervalIcon = "idle"  # 当前间隔对应的图标名
         self.timeLeftString = ""
 
+        # 截止时间调度器：整秒边界刷新显示，截止时刻直接触发 TIMER_FIRED
+        self.scheduler = scheduler or TBDeadlineTimer(self.clock)
+        self.scheduler.tick.connect(self.updateTimeLeft)
+        self.scheduler.fired.connect(self.onTimerFired)
+
+        # 剩余时间发布层：弹出窗口按秒刷新，托盘提示按分钟刷新，只推送变化。
+        # 只有活动的消费者决定唤醒间隔：弹出窗口只在可见时活动，托盘提示只在开启时活动，
+        # 没有任何消费者时一个间隔只在截止时刻唤醒一次
+        self.statusItem = None
+        self.publisher = TBTimeLeftPublisher()
+        self.popoverChannel = self.publisher.addChannel(self.publishTimeLeftString, granularity=1, active=False)
+        self.titleChannel = self.publisher.addChannel(self.publishTitle, granularity=60, table=MINUTES_TABLE,
+                                                      active=self.showTimerInMenuBar)
+        self.progressChannel = None  # 托盘进度图标，按间隔长度和帧数决定粒度
+        self.updateTickInterval()
+
         # 设置通知处理
         self.notificationCenter.setActionHandler(self.onNotificationAction)
 
+        # 设置由界面或其他入口修改后同步过来
+        self.settings.changed.connect(self.onSettingChanged)
+
+        # 记录每次状态转换；初始状态由应用在确认自己是唯一实例后发布到状态页，
+        # 直接创建计时器的基准和工具不会覆盖正在运行的实例的状态页
+        if recordHistory:
+            self.stateMachine.addTransitionHandler(self.onTransition)
+        self.stateMachine.addTransitionHandler(self.emitStateChanged)
+
+        # 所有路由和处理器都已注册，编译分发表
+        self.stateMachine.freeze()
+
+        # 其他线程（IPC、全局热键等）通过 postEvent 投递的事件排队后回到本线程处理
+        self.eventPosted.connect(self.processPostedEvents, Qt.QueuedConnection)
+        self.stateMachine.wakeup = self.eventPosted.emit
+
     def getStatusItem(self):
-        """获取状态栏项，避免循环导入问题"""
+        """获取状态栏项，避免循环导入问题；找到后缓存，不再重复导入"""
+        if self.statusItem:
+            return self.statusItem
         try:
             from app import TBStatusItem
             if TBStatusItem.shared:
-                return TBStatusItem.shared
+                self.statusItem = TBStatusItem.shared
+                return self.statusItem
         except Exception as e:
             print(f"获取状态项失败: {e}")
         return None
@@ -110,65 +159,125 @@ class TBTimer(QObject):
         """跳过休息"""
         self.stateMachine.handleEvent(TBStateMachineEvents.SKIP_REST)
 
-    def updateTimeLeft(self):
-        """更新剩余时间显示"""
-        if not self.finishTime:
-            self.timeLeftString = ""
-            return
+    @Slot()
+    def processPostedEvents(self):
+        """处理其他线程投递到状态机的事件"""
+        self.stateMachine.processEvents()
+
+    def isRunning(self):
+        """计时器是否在运行"""
+        return self.scheduler.isActive()
 
-        now = datetime.now()
-        time_diff = self.finishTime - now
+    def updateTimeLeft(self):
+        """更新剩余时间显示，由发布层决定哪些消费者需要刷新"""
+        self.publisher.publish(self.scheduler.remaining())
 
-        total_seconds = max(0, int(time_diff.total_seconds()))
-        minutes = total_seconds // 60
-        seconds = total_seconds % 60
-        self.timeLeftString = f"{minutes:02d}:{seconds:02d}"
+    def remainingSeconds(self):
+        """向上取整的剩余秒数，未运行时为 None；不依赖任何消费者是否活动"""
+        remaining = self.scheduler.remaining()
+        return None if remaining is None else math.ceil(remaining)
 
-        self.timeLeftStringChanged.emit(self.timeLeftString)
+    def updateTickInterval(self):
+        """按活动消费者各自的粒度设置唤醒时刻，每个消费者都在自己的边界上刷新"""
+        self.scheduler.setTickInterval(self.publisher.activeGranularities())
 
+    def setTimeLeftChannelActive(self, channel, active):
+        """消费者可见性变化：重新启用时立即推送当前值"""
+        if channel.active == active:
+            return
+        self.publisher.setActive(channel, active)
+        self.updateTickInterval()
+        if active:
+            self.updateTimeLeft()
+
+    def refreshTimeLeft(self):
+        """强制所有消费者重新获取当前剩余时间"""
+        self.publisher.refresh()
+
+    def publishTimeLeftString(self, timeLeftString):
+        """剩余秒数变化时通知界面"""
+        self.timeLeftString = timeLeftString
+        self.timeLeftStringChanged.emit(timeLeftString)
+
+    def publishTitle(self, title):
+        """剩余分钟数变化时更新托盘提示"""
         status_item = self.getStatusItem()
-        if status_item and self.timer and self.showTimerInMenuBar:
-            status_item.setTitle(self.timeLeftString)
-        elif status_item:
+        if not status_item:
+            return
+        if title and self.showTimerInMenuBar:
+            status_item.setTitle(title)
+        else:
             status_item.setTitle(None)
 
     def startTimer(self, seconds):
         """启动计时器"""
-        self.finishTime = datetime.now() + timedelta(seconds=seconds)
-
-        if self.timer:
-            self.timer.stop()
-
-        self.timer = QTimer()
-        self.timer.setInterval(500)
-        self.timer.timeout.connect(self.onTimerTick)
-        self.timer.start()
-
+        # 墙上时间的结束时刻，发布到状态页供外部读取方使用
+        self.finishTime = self.clock.time() + seconds
+        self.intervalLength = seconds
+        self.scheduler.start(seconds)
+        self.configureProgressIcon()
         self.updateTimeLeft()
 
     def stopTimer(self):
         """停止计时器"""
-        if self.timer:
-            self.timer.stop()
-            self.timer = None
+        self.scheduler.stop()
+        self.finishTime = None
+        self.intervalLength = 0
+        self.configureProgressIcon()
         self.player.stopTicking()
         self.updateTimeLeft()
 
-    def onTimerTick(self):
-        """计时器滴答处理，修复状态转换逻辑"""
-        self.updateTimeLeft()
-
-        if not self.finishTime:
+    def onSettingChanged(self, key, value):
+        """共享设置变化时更新计时器"""
+        if key == "showProgressIcon":
+            self.setShowProgressIcon(value)
+        elif key == "showTimerInMenuBar":
+            self.showTimerInMenuBar = value
+            self.setTimeLeftChannelActive(self.titleChannel, value)
+            if not value:
+                self.publishTitle(None)
+        elif key in TIMER_SETTINGS:
+            setattr(self, key, value)
+
+    def setShowProgressIcon(self, enabled):
+        """切换托盘进度图标"""
+        if enabled == self.showProgressIcon:
             return
+        self.showProgressIcon = enabled
+        self.settings.setValue("showProgressIcon", enabled)
+        self.configureProgressIcon()
+        status_item = self.getStatusItem()
+        if not enabled and status_item and self.isRunning():
+            status_item.setIcon(self.intervalIcon)
+
+    def configureProgressIcon(self):
+        """按当前间隔配置进度图标通道：每帧对应 intervalLength / 步数 秒"""
+        if self.progressChannel:
+            self.publisher.removeChannel(self.progressChannel)
+            self.progressChannel = None
 
-        now = datetime.now()
-        time_left = (self.finishTime - now).total_seconds()
+        status_item = self.getStatusItem()
+        progress_frames = getattr(status_item, "progressFrames", None)
+        if self.showProgressIcon and self.isRunning() and progress_frames:
+            frames = progress_frames(self.intervalIcon)
+            if frames:
+                self.progressChannel = self.publisher.addChannel(
+                    self.publishProgressIcon,
+                    granularity=self.intervalLength / (len(frames) - 1),
+                    table=frames,
+                )
+                self.publisher.publish(self.scheduler.remaining())
+        self.updateTickInterval()
+
+    def publishProgressIcon(self, icon):
+        """剩余比例跨过一帧时换上对应的预渲染图标"""
+        status_item = self.getStatusItem()
+        if icon and status_item:
+            status_item.setProgressIcon(icon)
 
-        if time_left <= 0:
-            if self.timer:
-                self.timer.stop()
-                self.timer = None
-            QTimer.singleShot(100, lambda: self.handleTimerComplete(time_left))
+    def onTimerFired(self):
+        """截止时间到达，立即处理状态转换；超时按调度器最早能发现的时刻计算"""
+        self.handleTimerComplete(-self.scheduler.overrun)
 
     def handleTimerComplete(self, time_left):
         """处理计时器完成事件"""
@@ -177,6 +286,38 @@ class TBTimer(QObject):
         else:
             self.stateMachine.handleEvent(TBStateMachineEvents.TIMER_FIRED)
 
+    def addTimeLeftChannel(self, callback, granularity=1, table=SECONDS_TABLE):
+        """注册剩余时间的消费者，并按新的粒度组合调整唤醒时刻"""
+        channel = self.publisher.addChannel(callback, granularity, table)
+        self.updateTickInterval()
+        return channel
+
+    def removeTimeLeftChannel(self, channel):
+        self.publisher.removeChannel(channel)
+        self.updateTickInterval()
+
+    def emitStateChanged(self, context):
+        """状态转换后通知外部订阅者"""
+        self.stateChanged.emit(context.toState.name.lower())
+
+    def onTransition(self, context):
+        """把状态转换写入 JSON 日志、二进制历史和状态页"""
+        logger.append(TBLogEventTransition(context))
+        history.append(context, self.intervalLength, self.clock.time())
+        self.publishStatusPage()
+
+    def publishStatusPage(self):
+        """把当前状态和截止时刻写入状态页，剩余时间由外部读取方自行计算"""
+        running = self.isRunning()
+        statusPage.publish(
+            self.stateMachine.currentState.name.lower(),
+            self.intervalIcon if running else "",
+            self.consecutiveWorkIntervals,
+            self.scheduler.deadline if running else None,
+            self.finishTime if running else None,
+            self.intervalLength,
+        )
+
     def onNotificationAction(self, action):
         """处理通知动作"""
         if action == TBNotification.Action.SKIP_REST and self.stateMachine.currentState == TBStateMachineStates.REST:
@@ -184,6 +325,7 @@ class TBTimer(QObject):
 
     def onWorkStart(self, from_state, to_state):
         """工作开始处理"""
+        self.intervalIcon = "work"
         status_item = self.getStatusItem()
         if status_item:
             status_item.setIcon("work")
@@ -224,15 +366,11 @@ class TBTimer(QObject):
                 # 短休息不重置计数器
 
             # 设置对应的托盘图标
+            self.intervalIcon = icon_name
             try:
-                from app import TBStatusItem
-                if TBStatusItem.shared:
-                    TBStatusItem.shared.setIcon(icon_name)
-                else:
-                    # 备用方案
-                    status_item = self.getStatusItem()
-                    if status_item:
-                        status_item.setIcon(icon_name)
+                status_item = self.getStatusItem()
+                if status_item:
+                    status_item.setIcon(icon_name)
             except Exception as e:
                 print(f"设置图标时出错: {e}")
                 import traceback
@@ -266,6 +404,7 @@ class TBTimer(QObject):
 
     def onIdleStart(self, from_state, to_state):
         """空闲状态开始处理"""
+        self.intervalIcon = "idle"
         self.player.stopTicking()
         self.stopTimer()
         status_item = self.getStatusItem()
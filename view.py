@@ -1,13 +1,16 @@
-from PySide6.QtCore import (Qt, QSettings, Signal, Slot, QSize, QTimer, QPoint,
+from PySide6.QtCore import (Qt, QSettings, Signal, Slot, QSize, QTimer, QPoint, QEvent,
                             Property, QEasingCurve, QPropertyAnimation, QRectF)
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QGroupBox,
     QPushButton, QLabel, QSlider, QSpinBox, QCheckBox,
     QTabWidget, QFrame, QApplication, QGridLayout, QToolButton
 )
-from PySide6.QtGui import QKeySequence, QShortcut, QPainterPath, QPainter, QRegion, QIcon, QColor, QBrush, QPen
+from PySide6.QtGui import (QKeySequence, QShortcut, QPainterPath, QPainter, QRegion, QIcon, QColor, QBrush, QPen,
+                           QPixmap)
+
+# ToggleSwitch 预渲染的轨道和滑块，所有开关共享，键为 (名称, 宽, 高, 设备像素比)
+_switchPixmaps = {}
 
-from timer import TBTimer
 
 class ToggleSwitch(QWidget):
     """自定义滑动开关控件"""
@@ -58,44 +61,87 @@ class ToggleSwitch(QWidget):
             self.setChecked(not self._checked)
         super().mousePressEvent(event)
 
-    def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
-        painter.setPen(Qt.NoPen)
+    def _pixmap(self, name, color, width, height, draw):
+        """取得预渲染的图块，第一次用到某种尺寸时才绘制"""
+        dpr = self.devicePixelRatioF()
+        key = (name, width, height, dpr)
+        pixmap = _switchPixmaps.get(key)
+        if pixmap is None:
+            pixmap = QPixmap(round(width * dpr), round(height * dpr))
+            pixmap.setDevicePixelRatio(dpr)
+            pixmap.fill(Qt.transparent)
+            painter = QPainter(pixmap)
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QBrush(color))
+            draw(painter, QRectF(0, 0, width, height))
+            painter.end()
+            _switchPixmaps[key] = pixmap
+        return pixmap
 
+    def paintEvent(self, event):
         margins = 3
         track_height = self.height() - 2 * margins
-        handle_diameter = track_height
         track_radius = track_height / 2.0
-        handle_radius = handle_diameter / 2.0
+        track_width = self.width() - 2 * margins
 
-        track_rect = QRectF(margins, margins, self.width() - 2 * margins, track_height)
-        bg_color = self._bg_color_on if self._checked else self._bg_color_off
-        painter.setBrush(QBrush(bg_color))
-        painter.drawRoundedRect(track_rect, track_radius, track_radius)
+        if self._checked:
+            track = self._pixmap("on", self._bg_color_on, track_width, track_height,
+                                 lambda p, r: p.drawRoundedRect(r, track_radius, track_radius))
+        else:
+            track = self._pixmap("off", self._bg_color_off, track_width, track_height,
+                                 lambda p, r: p.drawRoundedRect(r, track_radius, track_radius))
+        handle = self._pixmap("handle", self._handle_color, track_height, track_height,
+                              lambda p, r: p.drawEllipse(r))
 
-        handle_x = self._handle_offset
-        handle_rect = QRectF(handle_x, margins, handle_diameter, handle_diameter)
-        painter.setBrush(QBrush(self._handle_color))
-        painter.drawEllipse(handle_rect)
+        painter = QPainter(self)
+        painter.drawPixmap(margins, margins, track)
+        painter.drawPixmap(self._handle_offset, margins, handle)
 
     def sizeHint(self):
         return QSize(50, 26)
 
 
+# 设置项与弹出窗口上对应控件的属性名，设置从其他入口（例如控制套接字）修改时据此刷新
+SETTING_SWITCHES = {
+    "stopAfterBreak": "stopAfterBreakSwitch",
+    "showTimerInMenuBar": "showTimerInMenuBarSwitch",
+    "showProgressIcon": "showProgressIconSwitch",
+}
+SETTING_SLIDERS = {
+    "windupVolume": "windupSlider",
+    "dingVolume": "dingSlider",
+    "tickingVolume": "tickingSlider",
+}
+SETTING_VALUE_LABELS = {
+    "workIntervalLength": ("workValueLabel", "min"),
+    "shortRestIntervalLength": ("shortRestValueLabel", "min"),
+    "longRestIntervalLength": ("longRestValueLabel", "min"),
+    "workIntervalsInSet": ("workIntervalsValueLabel", ""),
+}
+
+
 class TBPopoverView(QWidget):
-    """主弹出窗口视图"""
-    def __init__(self):
+    """主弹出窗口视图
+
+    由 TBStatusItem 在第一次点击托盘图标时创建，计时器由外部传入。
+    标签页内容在第一次被选中时才创建。
+    """
+    def __init__(self, timer):
         super().__init__()
 
         self.setObjectName("popoverWidget")
         self.setWindowFlags(Qt.Popup | Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
 
-        self.timer = TBTimer()
-
+        self.timer = timer
+        self._labels = {}  # 每次刷新都要用的短文本，按当前语言缓存翻译
+        self._background = None  # 预渲染的圆角背景
+        self._backgroundKey = None  # (宽, 高, 设备像素比)
         self.initUI()
 
         self.timer.timeLeftStringChanged.connect(self.updateTimeLeft)
+        self.updateTimeLeft(self.timer.timeLeftString)
+        self.timer.settings.changed.connect(self.onSettingChanged)
 
         self.shortcut = QShortcut(QKeySequence("Ctrl+Alt+T"), self)
         self.shortcut.activated.connect(self.timer.startStop)
@@ -251,14 +297,13 @@ class TBPopoverView(QWidget):
             }
         """)
 
-        self.intervalsTab = self.createIntervalsTab()
-        self.tabWidget.addTab(self.intervalsTab, self.tr("Intervals"))
-
-        self.settingsTab = self.createSettingsTab()
-        self.tabWidget.addTab(self.settingsTab, self.tr("Settings"))
-
-        self.soundsTab = self.createSoundsTab()
-        self.tabWidget.addTab(self.soundsTab, self.tr("Sounds"))
+        # 先放空白页，标签页第一次被选中时再创建内容
+        self.tabBuilders = {}
+        self.intervalsTab = self.addLazyTab(self.createIntervalsTab, self.tr("Intervals"))
+        self.settingsTab = self.addLazyTab(self.createSettingsTab, self.tr("Settings"))
+        self.soundsTab = self.addLazyTab(self.createSoundsTab, self.tr("Sounds"))
+        self.tabWidget.currentChanged.connect(self.ensureTab)
+        self.ensureTab(self.tabWidget.currentIndex())
 
         layout.addWidget(self.tabWidget)
 
@@ -279,6 +324,21 @@ class TBPopoverView(QWidget):
 
         self.setLayout(layout)
 
+    def addLazyTab(self, builder, title):
+        """添加一个空白页，记下创建内容的方法"""
+        page = QWidget()
+        page_layout = QVBoxLayout(page)
+        page_layout.setContentsMargins(0, 0, 0, 0)
+        index = self.tabWidget.addTab(page, title)
+        self.tabBuilders[index] = builder
+        return page
+
+    def ensureTab(self, index):
+        """确保某个标签页的内容已经创建"""
+        builder = self.tabBuilders.pop(index, None)
+        if builder:
+            self.tabWidget.widget(index).layout().addWidget(builder())
+
     def _create_spin_controls(self, current_value, min_val, max_val, step, update_slot, value_label, unit=""):
         button_layout = QVBoxLayout()
         button_layout.setSpacing(0)
@@ -424,6 +484,14 @@ class TBPopoverView(QWidget):
         self.showTimerInMenuBarSwitch.toggled.connect(self.onShowTimerInMenuBarChanged)
         groupLayout.addWidget(self.showTimerInMenuBarSwitch, 1, 1, Qt.AlignRight | Qt.AlignVCenter)
 
+        showProgressLabel = QLabel(self.tr("Show progress in tray icon"))
+        groupLayout.addWidget(showProgressLabel, 3, 0, Qt.AlignLeft | Qt.AlignVCenter)
+
+        self.showProgressIconSwitch = ToggleSwitch()
+        self.showProgressIconSwitch.setChecked(self.timer.showProgressIcon, emit_signal=False)
+        self.showProgressIconSwitch.toggled.connect(self.onShowProgressIconChanged)
+        groupLayout.addWidget(self.showProgressIconSwitch, 3, 1, Qt.AlignRight | Qt.AlignVCenter)
+
         launchAtLoginLabel = QLabel(self.tr("Launch at login"))
         groupLayout.addWidget(launchAtLoginLabel, 2, 0, Qt.AlignLeft | Qt.AlignVCenter)
 
@@ -501,40 +569,66 @@ class TBPopoverView(QWidget):
     def onStartStopClicked(self):
         self.timer.startStop()
 
+    def label(self, text):
+        """取得缓存的翻译，切换语言时清空"""
+        translated = self._labels.get(text)
+        if translated is None:
+            translated = self._labels[text] = self.tr(text)
+        return translated
+
+    def changeEvent(self, event):
+        if event.type() == QEvent.LanguageChange:
+            self._labels.clear()
+        super().changeEvent(event)
+
     def updateTimeLeft(self, timeLeft):
-        if self.timer.timer:
-            self.startStopButton.setText(self.tr("Stop") if self.startStopButton.underMouse() else timeLeft)
+        if self.timer.isRunning():
+            self.startStopButton.setText(self.label("Stop") if self.startStopButton.underMouse() else timeLeft)
         else:
-            self.startStopButton.setText(self.tr("Start"))
+            self.startStopButton.setText(self.label("Start"))
+
+    def onSettingChanged(self, key, value):
+        """设置变化时刷新已经创建的控件，不再触发写回"""
+        if key in SETTING_SWITCHES:
+            switch = getattr(self, SETTING_SWITCHES[key], None)
+            if switch:
+                switch.setChecked(bool(value), emit_signal=False)
+        elif key in SETTING_SLIDERS:
+            slider = getattr(self, SETTING_SLIDERS[key], None)
+            if slider:
+                slider.blockSignals(True)
+                slider.setValue(round(value * 100))
+                slider.blockSignals(False)
+        elif key in SETTING_VALUE_LABELS:
+            name, unit = SETTING_VALUE_LABELS[key]
+            label = getattr(self, name, None)
+            if label:
+                label.setText(f"{value} {self.tr(unit)}" if unit else f"{value}")
 
     def onWorkIntervalChanged(self, value):
-        self.timer.workIntervalLength = value
         self.timer.settings.setValue("workIntervalLength", value)
         self.workValueLabel.setText(f"{value} {self.tr('min')}")
 
     def onShortRestIntervalChanged(self, value):
-        self.timer.shortRestIntervalLength = value
         self.timer.settings.setValue("shortRestIntervalLength", value)
         self.shortRestValueLabel.setText(f"{value} {self.tr('min')}")
 
     def onLongRestIntervalChanged(self, value):
-        self.timer.longRestIntervalLength = value
         self.timer.settings.setValue("longRestIntervalLength", value)
         self.longRestValueLabel.setText(f"{value} {self.tr('min')}")
 
     def onWorkIntervalsInSetChanged(self, value):
-        self.timer.workIntervalsInSet = value
         self.timer.settings.setValue("workIntervalsInSet", value)
         self.workIntervalsValueLabel.setText(f"{value}")
 
     def onStopAfterBreakChanged(self, checked):
-        self.timer.stopAfterBreak = checked
         self.timer.settings.setValue("stopAfterBreak", checked)
 
     def onShowTimerInMenuBarChanged(self, checked):
-        self.timer.showTimerInMenuBar = checked
         self.timer.settings.setValue("showTimerInMenuBar", checked)
-        self.timer.updateTimeLeft()
+
+    def onShowProgressIconChanged(self, checked):
+        self.timer.settings.setValue("showProgressIcon", checked)
 
     def onLaunchAtLoginChanged(self, checked):
         settings = QSettings("HKEY_CURRENT_USER\\Software\\Microsoft\\Windows\\CurrentVersion\\Run",
@@ -576,22 +670,31 @@ class TBPopoverView(QWidget):
     def sizeHint(self):
         return QSize(300, 360)
 
-    def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        # 遮罩只随尺寸变化，不在每次重绘时设置（setMask 本身会触发重绘）
+        radius = 10.0
+        mask_path = QPainterPath()
+        mask_path.addRoundedRect(QRectF(self.rect()), radius, radius)
+        self.setMask(QRegion(mask_path.toFillPolygon().toPolygon()))
 
+    def renderBackground(self, dpr):
+        """按当前尺寸和设备像素比渲染圆角背景和边框"""
         radius = 10.0
         pen_width = 3
 
-        rect = self.rect().adjusted(pen_width / 2, pen_width / 2, -pen_width / 2, -pen_width / 2)
+        pixmap = QPixmap(round(self.width() * dpr), round(self.height() * dpr))
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(Qt.transparent)
+
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+
+        rect = QRectF(self.rect()).adjusted(pen_width / 2, pen_width / 2, -pen_width / 2, -pen_width / 2)
 
         path = QPainterPath()
         path.addRoundedRect(rect, radius, radius)
 
-        mask_path = QPainterPath()
-        mask_path.addRoundedRect(self.rect(), radius, radius)
-        self.setMask(QRegion(mask_path.toFillPolygon().toPolygon()))
-
         painter.fillPath(path, Qt.white)
 
         pen = painter.pen()
@@ -599,12 +702,27 @@ class TBPopoverView(QWidget):
         pen.setWidth(pen_width)
         painter.setPen(pen)
         painter.drawPath(path)
+        painter.end()
+        return pixmap
+
+    def paintEvent(self, event):
+        dpr = self.devicePixelRatioF()
+        key = (self.width(), self.height(), dpr)
+        if key != self._backgroundKey:
+            self._background = self.renderBackground(dpr)
+            self._backgroundKey = key
+
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self._background)
 
     def showEvent(self, event):
         super().showEvent(event)
+        # 可见时才按秒刷新剩余时间
+        self.timer.setTimeLeftChannelActive(self.timer.popoverChannel, True)
         self.activateWindow()
         self.raise_()
 
     def hideEvent(self, event):
         super().hideEvent(event)
+        self.timer.setTimeLeftChannelActive(self.timer.popoverChannel, False)
 